@@ -0,0 +1,283 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core.files import private_file
+
+CULL_EVERY = 100
+
+# L1 общий для всех потоков процесса: Django создаёт экземпляр бэкенда
+# на поток, а запись в одном потоке должна сбрасывать L1 для всех.
+_l1_stores = {}
+_l1_locks = {}
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite (LOCATION), общий для всех процессов машины.
+
+    Целые числа хранятся как INTEGER, поэтому incr атомарен между
+    процессами; остальные значения хранятся в pickle, поэтому файл
+    создаётся с правами 0600: записать в него — значит выполнить код.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._connection = None
+        self._sets = 0
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            connection = sqlite3.connect(
+                private_file(self.path), timeout=10, isolation_level=None,
+                check_same_thread=False)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+            self._connection = connection
+        return self._connection
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _decode(self, value):
+        return pickle.loads(value) if isinstance(value, bytes) else value
+
+    def _alive(self):
+        return '(expires IS NULL OR expires > ?)', time.time()
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {}
+        for key in keys:
+            made[self.make_key(key, version=version)] = key
+            self.validate_key(key)
+        if not made:
+            return {}
+        alive, now = self._alive()
+        rows = self.connection.execute(
+            'SELECT key, value FROM cache WHERE key IN ({}) AND {}'.format(
+                ', '.join('?' * len(made)), alive),
+            (*made, now),
+        )
+        return {made[key]: self._decode(value) for key, value in rows}
+
+    def _write(self, key, value, timeout, version, only_if_missing=False):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expires = self.get_backend_timeout(timeout)
+        sql = (
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires'
+        )
+        params = [key, self._encode(value), expires]
+        if only_if_missing:
+            sql += ' WHERE expires IS NOT NULL AND expires <= ?'
+            params.append(time.time())
+        written = self.connection.execute(sql, params).rowcount > 0
+        self._sets += 1
+        if self._sets % CULL_EVERY == 0:
+            self._cull()
+        return written
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._write(key, value, timeout, version, only_if_missing=True)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        alive, now = self._alive()
+        return self.connection.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {alive}',
+            (self.get_backend_timeout(timeout), key, now),
+        ).rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self.connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def incr(self, key, delta=1, version=None):
+        made = self.make_key(key, version=version)
+        self.validate_key(made)
+        alive, now = self._alive()
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            updated = connection.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ? '
+                f"AND typeof(value) = 'integer' AND {alive}",
+                (delta, made, now),
+            ).rowcount
+            value = connection.execute(
+                'SELECT value FROM cache WHERE key = ?', (made,)
+            ).fetchone() if updated else None
+        finally:
+            connection.execute('COMMIT')
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value[0]
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def _cull(self):
+        connection = self.connection
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,),
+            )
+
+
+class TwoTierCache(BaseCache):
+    """L1 — ограниченный LRU в памяти процесса, L2 — общий кэш (OPTIONS
+    L2 — имя другого кэша из CACHES).
+
+    Ключи с префиксами из SHARED_KEY_PREFIXES (счётчики версий) всегда
+    читаются из L2: поднятая в одном процессе версия видна остальным
+    при следующем же чтении, а значения, проверяемые по версиям, можно
+    брать из L1. Прочие ключи живут в L1 не дольше L1_TIMEOUT секунд,
+    запись и удаление сразу идут в L2.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, name, params):
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'shared')
+        self.l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self.l1_timeout = float(options.get('L1_TIMEOUT', 5))
+        self.shared_prefixes = tuple(options.get('SHARED_KEY_PREFIXES', ()))
+        params = {**params, 'OPTIONS': {}}
+        super().__init__(params)
+        self._l1 = _l1_stores.setdefault(name, OrderedDict())
+        self._lock = _l1_locks.setdefault(name, threading.Lock())
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def shared(self, key):
+        return key.startswith(self.shared_prefixes)
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            pickled, expires = entry
+            if expires <= time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _l1_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        lifetime = self.l1_timeout if timeout is None else min(
+            timeout, self.l1_timeout)
+        if lifetime <= 0:
+            return self._l1_delete(key)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._lock:
+            self._l1[key] = (pickled, time.monotonic() + lifetime)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def get(self, key, default=None, version=None):
+        if self.shared(key):
+            return self.l2.get(key, default, version=version)
+        made = self.make_key(key, version=version)
+        value = self._l1_get(made)
+        if value is not None:
+            return value
+        value = self.l2.get(key, version=version)
+        if value is None:
+            return default
+        self._l1_set(made, value)
+        return value
+
+    def get_shared(self, key, default=None, version=None):
+        """get мимо L1: значение из L2 заменяет копию процесса."""
+        made = self.make_key(key, version=version)
+        value = self.l2.get(key, version=version)
+        if value is None:
+            self._l1_delete(made)
+            return default
+        if not self.shared(key):
+            self._l1_set(made, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            value = None if self.shared(key) else self._l1_get(
+                self.make_key(key, version=version))
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            fetched = self.l2.get_many(missing, version=version)
+            for key, value in fetched.items():
+                if not self.shared(key):
+                    self._l1_set(self.make_key(key, version=version), value)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        if not self.shared(key):
+            self._l1_set(self.make_key(key, version=version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added and not self.shared(key):
+            self._l1_set(self.make_key(key, version=version), value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(self.make_key(key, version=version))
+        self.l2.delete(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_delete(self.make_key(key, version=version))
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
@@ -0,0 +1,40 @@
+from django.db.backends.sqlite3 import base
+
+# Значения по умолчанию; переопределяются через OPTIONS['pragmas'].
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite для боевого режима.
+
+    Каждое новое соединение переводится в WAL и получает прагмы из
+    PRAGMAS, транзакции начинаются с BEGIN IMMEDIATE: блокировка на
+    запись берётся сразу и ждёт busy_timeout, а не падает с «database is
+    locked» при попытке повысить уже открытую транзакцию чтения.
+    Соединения переиспользуются в пределах CONN_MAX_AGE.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **params.pop('pragmas', {})}
+        self.transaction_mode = params.pop('transaction_mode', 'IMMEDIATE')
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = dict(self.pragmas)
+        if self.is_in_memory_db():
+            pragmas.pop('journal_mode')
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}'.strip())
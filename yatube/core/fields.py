@@ -0,0 +1,32 @@
+import hashlib
+
+from django.db import models
+
+
+def content_hash(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+class ContentHashField(models.CharField):
+    """SHA-256 значения другого поля модели, заполняется при сохранении.
+
+    Хэш пересчитывается в pre_save, поэтому он верен и для save(), и для
+    bulk_create(); queryset.update() поле-источник обходит стороной.
+    """
+
+    def __init__(self, *args, source, **kwargs):
+        self.source = source
+        kwargs['max_length'] = 64
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs['max_length']
+        kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = content_hash(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
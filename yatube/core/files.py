@@ -0,0 +1,31 @@
+import os
+
+from django.conf import settings
+
+
+def var_path(*parts):
+    """Путь к служебному файлу проекта: кэшу, метрикам, журналам.
+
+    Каталог VAR_DIR (по умолчанию var/ в BASE_DIR), а не общий /tmp:
+    там файл с заранее известным именем может создать кто угодно.
+    """
+    return os.path.join(
+        getattr(settings, 'VAR_DIR', os.path.join(settings.BASE_DIR, 'var')),
+        *parts)
+
+
+def private_opener(path, flags):
+    """opener для open(): новый файл доступен только владельцу."""
+    return os.open(path, flags, 0o600)
+
+
+def private_file(path):
+    """Создаёт файл с правами 0600 и каталоги к нему с 0700, если их нет.
+
+    Нужно перед sqlite3.connect, который создаёт базу с правами по umask.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.close(private_opener(path, os.O_WRONLY | os.O_CREAT))
+    return path
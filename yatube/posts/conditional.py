@@ -0,0 +1,129 @@
+"""Валидаторы условных GET-запросов (ETag / Last-Modified).
+
+Состояние страницы берётся одним запросом по индексам, без рендеринга
+шаблона, и запоминается на объекте запроса: `condition()` вызывает
+функции ETag и Last-Modified по отдельности.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, OuterRef, Subquery
+from django.views.decorators import http
+
+from . import thumbnails
+from .models import Comment, Group, Post, User
+
+
+def condition(etag_func=None, last_modified_func=None):
+    """django.views.decorators.http.condition для страниц с миниатюрами.
+
+    Готовность миниатюры не видна в состоянии страницы, поэтому страница
+    с заглушкой (thumbnails.Placeholder) уходит без ETag и Last-Modified:
+    иначе после нарезки миниатюры клиент с прежним If-None-Match получил
+    бы 304 и продолжал показывать заглушку.
+    """
+    def decorator(view):
+        conditional_view = http.condition(etag_func, last_modified_func)(
+            view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            placeholders = thumbnails.placeholders_rendered()
+            response = conditional_view(request, *args, **kwargs)
+            if thumbnails.placeholders_rendered() != placeholders:
+                del response['ETag']
+                del response['Last-Modified']
+            return response
+        return inner
+    return decorator
+
+
+def _state(request, lookup, *args):
+    key = (lookup.__name__, args)
+    states = request.__dict__.setdefault('_conditional_states', {})
+    if key not in states:
+        states[key] = lookup(*args)
+    return states[key]
+
+
+def _latest(queryset, field):
+    return Subquery(
+        queryset.order_by(f'-{field}').values(field)[:1])
+
+
+def _post_state(post_id):
+    return Post.objects.filter(pk=post_id).annotate(
+        last_comment=_latest(
+            Comment.objects.filter(post=OuterRef('pk')), 'created')
+    ).values(
+        'updated', 'last_comment', 'comments_count', 'group_id',
+        'author__counters__posts_count',
+    ).first()
+
+
+def _profile_state(username):
+    return User.objects.filter(username=username).annotate(
+        last_post=_latest(
+            Post.objects.filter(author=OuterRef('pk')), 'updated')
+    ).values(
+        'pk', 'last_post', 'counters__posts_count',
+        'counters__followers_count', 'counters__following_count',
+    ).first()
+
+
+def _group_state(slug):
+    posts = Post.objects.filter(group=OuterRef('pk'))
+    return Group.objects.filter(slug=slug).annotate(
+        last_post=_latest(posts, 'updated'),
+        posts_count=Subquery(
+            posts.order_by().values('group').annotate(
+                total=Count('pk')).values('total')
+        ),
+    ).values(
+        'pk', 'title', 'description', 'last_post', 'posts_count',
+    ).first()
+
+
+def _last_modified(request, state, *fields):
+    # Страница авторизованного пользователя зависит от него самого,
+    # поэтому для неё полагаемся только на ETag.
+    if state is None or request.user.is_authenticated:
+        return None
+    return max(
+        (state[field] for field in fields if state[field]), default=None)
+
+
+def _etag(request, state):
+    if state is None:
+        return None
+    value = repr((request.user.pk, request.GET.urlencode(), state))
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def post_etag(request, post_id):
+    return _etag(request, _state(request, _post_state, post_id))
+
+
+def post_last_modified(request, post_id):
+    return _last_modified(
+        request, _state(request, _post_state, post_id),
+        'updated', 'last_comment',
+    )
+
+
+def profile_etag(request, username):
+    return _etag(request, _state(request, _profile_state, username))
+
+
+def profile_last_modified(request, username):
+    state = _state(request, _profile_state, username)
+    return _last_modified(request, state, 'last_post')
+
+
+def group_etag(request, slug):
+    return _etag(request, _state(request, _group_state, slug))
+
+
+def group_last_modified(request, slug):
+    return _last_modified(
+        request, _state(request, _group_state, slug), 'last_post')
@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Post, User, UserCounters
+
+USER_COUNTERS = ('posts_count', 'followers_count', 'following_count')
+
+
+def counters_for(user):
+    """Счётчики пользователя; без строки в таблице — нулевые."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        return UserCounters(user=user)
+
+
+def bump_user(user_id, **deltas):
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    # Счётчики беззнаковые: уже разошедшийся ноль не уводим в минус.
+    floor = {
+        f'{field}__gte': -delta
+        for field, delta in deltas.items() if delta < 0
+    }
+    with transaction.atomic():
+        updated = UserCounters.objects.filter(
+            user_id=user_id, **floor).update(**changes)
+        # Уменьшать нечего, если строки нет (например, пользователь
+        # удаляется вместе со своими счётчиками).
+        if updated or min(deltas.values()) < 0:
+            return
+        UserCounters.objects.get_or_create(user_id=user_id)
+        UserCounters.objects.filter(user_id=user_id).update(**changes)
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id, comments_count__gte=-delta).update(
+        comments_count=F('comments_count') + delta)
+
+
+def actual_user_counters():
+    """Реальные значения счётчиков, посчитанные по таблицам."""
+    counters = {}
+    for field, relation in (('posts_count', 'posts'),
+                            ('followers_count', 'following'),
+                            ('following_count', 'follower')):
+        rows = User.objects.annotate(
+            value=Count(relation)).values_list('pk', 'value')
+        for user_id, value in rows:
+            counters.setdefault(user_id, {})[field] = value
+    return counters
+
+
+def audit(fix=False):
+    """Находит расхождения счётчиков с таблицами и при fix=True чинит их.
+
+    Возвращает список (объект, поле, сохранённое, реальное).
+    """
+    drift = []
+    stored = UserCounters.objects.in_bulk()
+    to_create, to_update = [], []
+    for user_id, values in actual_user_counters().items():
+        counters = stored.get(user_id)
+        if counters is None:
+            counters = UserCounters(user_id=user_id)
+            if any(values.values()):
+                to_create.append(counters)
+        elif any(getattr(counters, f) != values[f] for f in USER_COUNTERS):
+            to_update.append(counters)
+        for field in USER_COUNTERS:
+            if getattr(counters, field) != values[field]:
+                drift.append((counters, field, getattr(counters, field),
+                              values[field]))
+                setattr(counters, field, values[field])
+    posts = Post.objects.annotate(actual=Count('comments')).exclude(
+        comments_count=F('actual')).only('pk', 'comments_count')
+    posts = list(posts)
+    for post in posts:
+        drift.append((post, 'comments_count', post.comments_count,
+                      post.actual))
+        post.comments_count = post.actual
+    if fix:
+        with transaction.atomic():
+            UserCounters.objects.bulk_create(to_create, batch_size=500)
+            UserCounters.objects.bulk_update(
+                to_update, USER_COUNTERS, batch_size=500)
+            Post.objects.bulk_update(
+                posts, ['comments_count'], batch_size=500)
+    return drift
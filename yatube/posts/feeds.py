@@ -0,0 +1,105 @@
+import heapq
+from itertools import dropwhile, islice, takewhile
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import routers
+from .models import Follow, Post
+from .paginator import KeysetPaginator, paginate
+from .timeline import TimelinePaginator, timeline_for
+
+AUTHOR_RECENT_POSTS = getattr(settings, 'AUTHOR_RECENT_POSTS', 200)
+AUTHOR_RECENT_POSTS_KEY = 'author_recent_posts:{}'
+
+
+def invalidate_recent_posts(author_id):
+    cache.delete(AUTHOR_RECENT_POSTS_KEY.format(author_id))
+
+
+def recent_posts(author_ids):
+    """Ключи (pub_date, pk) свежих постов каждого автора, из кэша."""
+    keys = {
+        AUTHOR_RECENT_POSTS_KEY.format(author_id): author_id
+        for author_id in author_ids
+    }
+    cached = cache.get_many(keys)
+    missing = {}
+    with routers.primary_reads():
+        for key, author_id in keys.items():
+            if key not in cached:
+                missing[key] = list(
+                    Post.objects.filter(author_id=author_id)
+                    .order_by('-pub_date', '-pk')
+                    .values_list('pub_date', 'pk')[:AUTHOR_RECENT_POSTS]
+                )
+    if missing:
+        cache.set_many(missing, None)
+    return list({**cached, **missing}.values())
+
+
+class MergedFeed:
+    """Лента подписок как k-way merge списков свежих постов авторов."""
+
+    def __init__(self, author_ids):
+        self.lists = recent_posts(author_ids)
+
+    def __len__(self):
+        return sum(len(keys) for keys in self.lists)
+
+    def __getitem__(self, index):
+        return self.hydrate(islice(self.keys(), index.start, index.stop))
+
+    def keys(self):
+        return heapq.merge(*self.lists, reverse=True)
+
+    def hydrate(self, keys):
+        pks = [pk for _, pk in keys]
+        posts = Post.objects.for_feed().in_bulk(pks)
+        return [posts[pk] for pk in pks if pk in posts]
+
+
+class MergedFeedPaginator(KeysetPaginator):
+    def order(self, object_list):
+        return object_list
+
+    def rows_after(self, key, limit):
+        keys = self.object_list.keys()
+        if key is not None:
+            keys = dropwhile(lambda item: item >= key, keys)
+        return self.object_list.hydrate(islice(keys, limit))
+
+    def rows_before(self, key, limit):
+        newer = list(
+            takewhile(lambda item: item > key, self.object_list.keys())
+        )
+        return self.object_list.hydrate(newer[-limit:])
+
+
+def join_feed(request):
+    return paginate(
+        request,
+        Post.objects.for_feed().filter(author__following__user=request.user)
+    )
+
+
+def timeline_feed(request):
+    return paginate(request, timeline_for(request.user), TimelinePaginator)
+
+
+def merged_feed(request):
+    author_ids = Follow.objects.filter(user=request.user).values_list(
+        'author_id', flat=True)
+    return paginate(request, MergedFeed(author_ids), MergedFeedPaginator)
+
+
+FEED_ENGINES = {
+    'join': join_feed,
+    'timeline': timeline_feed,
+    'merge': merged_feed,
+}
+
+
+def follow_feed(request, engine=None):
+    engine = engine or getattr(settings, 'FOLLOW_FEED_ENGINE', 'timeline')
+    return FEED_ENGINES[engine](request)
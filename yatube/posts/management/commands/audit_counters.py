@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет денормализованные счётчики постов, комментариев и '
+        'подписок с таблицами; с --fix исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true', help='Исправить расхождения.')
+
+    def handle(self, *args, **options):
+        drift = counters.audit(fix=options['fix'])
+        for obj, field, stored, actual in drift:
+            self.stdout.write(
+                f'{obj._meta.model_name} {obj.pk}: {field} '
+                f'{stored} -> {actual}'
+            )
+        action = 'исправлено' if options['fix'] else 'найдено'
+        self.stdout.write(f'Расхождений {action}: {len(drift)}')
@@ -0,0 +1,91 @@
+import statistics
+import time
+from itertools import product
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from posts import timeline
+from posts.feeds import FEED_ENGINES, follow_feed
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает движки ленты подписок при росте числа подписок и '
+        'постов. Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--follows', type=int, nargs='+', default=[10, 100, 500])
+        parser.add_argument(
+            '--posts-per-author', type=int, nargs='+', default=[10, 100])
+        parser.add_argument(
+            '--depth', type=int, default=5,
+            help='Сколько страниц пролистать курсором.'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def seed(self, follows, posts_per_author):
+        reader = User.objects.create(username='bench_reader')
+        User.objects.bulk_create(
+            User(username=f'bench_author_{i}') for i in range(follows))
+        authors = list(User.objects.filter(username__startswith='bench_a'))
+        Post.objects.bulk_create(
+            Post(author=author, text=f'bench {author.pk} {i}')
+            for author in authors for i in range(posts_per_author)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for author in authors)
+        # bulk_create не шлёт сигналы: ленту читателя собираем сами.
+        for author in authors:
+            timeline.backfill(reader.pk, author.pk)
+        return reader
+
+    def walk(self, engine, reader, depth):
+        factory = RequestFactory()
+        params = {}
+        for _ in range(depth):
+            request = factory.get('/follow/', params)
+            request.user = reader
+            page = follow_feed(request, engine)
+            list(page)
+            if not page.has_next():
+                break
+            params = {'after': page.next_cursor()}
+
+    def measure(self, engine, reader, depth, repeat, cold):
+        timings = []
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+            started = time.perf_counter()
+            self.walk(engine, reader, depth)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        engines = [(name, False) for name in FEED_ENGINES]
+        engines.append(('merge', True))
+        header = ' '.join(
+            f'{name + (" cold" if cold else ""):>12}'
+            for name, cold in engines
+        )
+        self.stdout.write(f'{"follows":>8} {"posts":>6} {header}  (ms)')
+        for follows, posts_per_author in product(
+                options['follows'], options['posts_per_author']):
+            with transaction.atomic():
+                reader = self.seed(follows, posts_per_author)
+                cache.clear()
+                timings = ' '.join(
+                    f'{self.measure(name, reader, options["depth"], options["repeat"], cold):>12.2f}'  # noqa: E501
+                    for name, cold in engines
+                )
+                transaction.set_rollback(True)
+            self.stdout.write(f'{follows:>8} {posts_per_author:>6} {timings}')
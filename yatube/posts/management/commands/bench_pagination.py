@@ -0,0 +1,84 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+
+from posts.models import Post
+from posts.paginator import POSTS_PER_PAGE, KeysetPaginator
+
+User = get_user_model()
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время выдачи глубоких страниц ленты: Paginator '
+        '(COUNT + OFFSET) против KeysetPaginator (курсор по pub_date, pk). '
+        'Запускайте на отдельной базе SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=1_000_000,
+            help='Сколько постов должно быть в базе (досоздаются при --seed).'
+        )
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Досоздать недостающие посты через bulk_create.'
+        )
+        parser.add_argument(
+            '--pages', type=int, nargs='+',
+            default=[1, 10, 100, 1000, 10000, 50000],
+            help='Номера страниц, для которых замеряется время.'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def seed(self, total):
+        author, _ = User.objects.get_or_create(username='bench_author')
+        existing = Post.objects.count()
+        for start in range(existing, total, BATCH_SIZE):
+            stop = min(start + BATCH_SIZE, total)
+            Post.objects.bulk_create(
+                Post(text=f'bench post {i}', author=author)
+                for i in range(start, stop)
+            )
+            self.stdout.write(f'seeded {stop}/{total}')
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['posts'])
+        posts = Post.objects.all()
+        self.stdout.write(f'{"page":>8} {"offset, ms":>12} {"keyset, ms":>12}')
+        for number in options['pages']:
+            depth = (number - 1) * POSTS_PER_PAGE
+            keyset = KeysetPaginator(posts)
+            # Ключ строки перед страницей — то, что лежит в ссылке ?after=.
+            previous = keyset.object_list[depth - 1:depth].first() if (
+                depth) else None
+            if depth and previous is None:
+                break
+            after = (previous.pub_date, previous.pk) if previous else None
+
+            def offset_page():
+                paginator = Paginator(posts, POSTS_PER_PAGE)
+                list(paginator.page(number))
+
+            def keyset_page():
+                list(KeysetPaginator(posts).get_cursor_page(after=after))
+
+            self.stdout.write(
+                f'{number:>8} '
+                f'{self.measure(offset_page, options["repeat"]):>12.2f} '
+                f'{self.measure(keyset_page, options["repeat"]):>12.2f}'
+            )
@@ -0,0 +1,138 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import F, Max, Min
+
+from posts.models import Comment, Post, User
+from posts.writequeue import WriteQueue
+
+from .bench_views import percentile
+
+CONFIGS = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0},
+    'tuned': {'ENGINE': 'core.backends.sqlite3', 'CONN_MAX_AGE': 60},
+    'queued': {'ENGINE': 'core.backends.sqlite3', 'CONN_MAX_AGE': 60},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стандартный бэкенд sqlite3 (журнал отката, новое '
+        'соединение на запрос) с core.backends.sqlite3 (WAL, прагмы, '
+        'BEGIN IMMEDIATE, постоянные соединения), а его же с записью через '
+        'очередь posts.writequeue — под параллельной нагрузкой: чтение '
+        'ленты и добавление комментариев. Каждый вариант работает на своей '
+        'копии базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля операций записи.'
+        )
+
+    def copy_database(self, journal_mode):
+        source = settings.DATABASES['default']['NAME']
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        with sqlite3.connect(source) as src, sqlite3.connect(path) as dst:
+            src.backup(dst)
+            dst.execute(f'PRAGMA journal_mode = {journal_mode}')
+        return path
+
+    def add_alias(self, name, path):
+        alias = f'bench_{name}'
+        connections.databases[alias] = {**CONFIGS[name], 'NAME': path}
+        return alias
+
+    def read(self, alias, post_ids):
+        pk = random.randint(*post_ids)
+        list(Post.objects.using(alias).for_feed().filter(pk__lte=pk)[:10])
+
+    def add_comment(self, alias, post_ids, user_ids):
+        pk = random.randint(*post_ids)
+        post = Post.objects.using(alias).filter(pk__gte=pk).only(
+            'pk').first()
+        Comment.objects.using(alias).bulk_create([Comment(
+            post=post, author_id=random.randint(*user_ids), text='bench')])
+        Post.objects.using(alias).filter(pk=post.pk).update(
+            comments_count=F('comments_count') + 1)
+
+    def write(self, alias, post_ids, user_ids, writer):
+        if writer is not None:
+            writer.submit(self.add_comment, alias, post_ids, user_ids)
+            return
+        with transaction.atomic(using=alias):
+            self.add_comment(alias, post_ids, user_ids)
+
+    def worker(self, alias, deadline, ratio, ids, results, writer):
+        post_ids, user_ids = ids
+        connection = connections[alias]
+        timings, errors = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if random.random() < ratio:
+                    self.write(alias, post_ids, user_ids, writer)
+                else:
+                    self.read(alias, post_ids)
+                timings.append((time.perf_counter() - started) * 1000)
+            except OperationalError:
+                errors += 1
+            # Конец «запроса»: как request_finished с учётом CONN_MAX_AGE.
+            connection.close_if_unusable_or_obsolete()
+        connection.close()
+        results.append((timings, errors))
+
+    def run(self, name, options, ids):
+        path = self.copy_database('DELETE' if name == 'default' else 'WAL')
+        alias = self.add_alias(name, path)
+        writer = WriteQueue(using=alias) if name == 'queued' else None
+        results = []
+        deadline = time.perf_counter() + options['seconds']
+        threads = [
+            threading.Thread(target=self.worker, args=(
+                alias, deadline, options['write_ratio'], ids, results,
+                writer))
+            for _ in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if writer is not None:
+            writer.stop()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        timings = [t for thread_timings, _ in results for t in thread_timings]
+        return {
+            'ops': len(timings) / options['seconds'],
+            'p50': percentile(sorted(timings), 50) if timings else 0,
+            'p95': percentile(sorted(timings), 95) if timings else 0,
+            'errors': sum(errors for _, errors in results),
+        }
+
+    def handle(self, *args, **options):
+        posts = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        users = User.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if posts['low'] is None or users['low'] is None:
+            raise CommandError('В базе нет постов: запустите seed_data.')
+        ids = ((posts['low'], posts['high']), (users['low'], users['high']))
+        self.stdout.write(
+            f'{"backend":<8} {"ops/s":>9} {"p50":>8} {"p95":>8} '
+            f'{"locked":>7}  (ms)')
+        for name in CONFIGS:
+            row = self.run(name, options, ids)
+            self.stdout.write(
+                f'{name:<8} {row["ops"]:>9.1f} {row["p50"]:>8.2f} '
+                f'{row["p95"]:>8.2f} {row["errors"]:>7}')
@@ -0,0 +1,86 @@
+import os
+import random
+import sqlite3
+import string
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.fields import content_hash
+
+SCHEMAS = {
+    'unique text': (
+        'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT NOT NULL '
+        'UNIQUE)',
+        'INSERT INTO post (text) VALUES (?)',
+        'SELECT 1 FROM post WHERE text = ?',
+    ),
+    'unique hash': (
+        'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT NOT NULL, '
+        'text_hash VARCHAR(64) NOT NULL UNIQUE)',
+        'INSERT INTO post (text, text_hash) VALUES (?, ?)',
+        'SELECT 1 FROM post WHERE text_hash = ?',
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер уникального индекса, скорость вставки и '
+        'проверки дубликата для UNIQUE(text) и UNIQUE(text_hash) на '
+        'временной базе SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--text-length', type=int, default=1000)
+        parser.add_argument('--batch', type=int, default=1000)
+
+    def texts(self, rows, length):
+        alphabet = string.ascii_letters + ' '
+        for i in range(rows):
+            body = ''.join(random.choices(alphabet, k=length))
+            yield f'{i} {body}'
+
+    def run_schema(self, path, schema, texts, batch_size):
+        create, insert, lookup = schema
+        connection = sqlite3.connect(path)
+        connection.execute(create)
+        hashed = 'text_hash' in insert
+        started = time.perf_counter()
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            rows = [(text, content_hash(text)) if hashed else (text,)
+                    for text in batch]
+            with connection:
+                connection.executemany(insert, rows)
+        insert_time = time.perf_counter() - started
+        probes = random.sample(texts, min(1000, len(texts)))
+        started = time.perf_counter()
+        for text in probes:
+            key = content_hash(text) if hashed else text
+            connection.execute(lookup, (key,)).fetchone()
+        lookup_time = (time.perf_counter() - started) / len(probes)
+        index_size = connection.execute(
+            "SELECT SUM(pgsize) FROM dbstat "
+            "WHERE name LIKE 'sqlite_autoindex_post%'"
+        ).fetchone()[0]
+        connection.close()
+        return len(texts) / insert_time, index_size, lookup_time
+
+    def handle(self, *args, **options):
+        texts = list(self.texts(options['rows'], options['text_length']))
+        self.stdout.write(
+            f'{"schema":<12} {"rows/s":>10} {"index, MiB":>11} '
+            f'{"lookup, us":>11}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, schema in SCHEMAS.items():
+                path = os.path.join(directory, f'{name.split()[1]}.sqlite3')
+                rate, size, lookup = self.run_schema(
+                    path, schema, texts, options['batch'])
+                self.stdout.write(
+                    f'{name:<12} {rate:>10.0f} {size / 2 ** 20:>11.2f} '
+                    f'{lookup * 10 ** 6:>11.2f}'
+                )
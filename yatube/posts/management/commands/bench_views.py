@@ -0,0 +1,164 @@
+import copy
+import json
+import random
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from about import urls as about_urls
+from posts import urls as posts_urls
+from posts.models import Group, Post, User
+from users import urls as users_urls
+
+ROLES = ('anonymous', 'reader')
+
+
+def percentile(values, share):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100)[share - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все именованные маршруты через тестовый клиент и '
+        'печатает p50/p95/p99 времени ответа и число запросов к базе. '
+        'Каждый запрос выполняется в транзакции и откатывается, поэтому '
+        'изменяющие маршруты не портят данные. Запускайте на базе, '
+        'наполненной командой seed_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Сколько запросов на маршрут и роль.'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--json', dest='json_path',
+            help='Сохранить результаты в JSON-файл.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON-файл прошлого прогона: печатать разницу p95.'
+        )
+
+    def random_posts(self, count):
+        bounds = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            raise CommandError('В базе нет постов: запустите seed_data.')
+        posts = []
+        for _ in range(count):
+            pk = random.randint(bounds['low'], bounds['high'])
+            posts.append(
+                Post.objects.filter(pk__gte=pk).order_by('pk')
+                .select_related('author', 'group').first()
+            )
+        return posts
+
+    def kwargs_sampler(self, count):
+        """Аргументы маршрутов берутся из случайных постов базы."""
+        posts = self.random_posts(count)
+        slugs = list(Group.objects.values_list('slug', flat=True)[:1000])
+
+        def sample():
+            post = random.choice(posts)
+            return {
+                'post_id': post.pk,
+                'username': post.author.username,
+                'slug': post.group.slug if post.group else (
+                    random.choice(slugs) if slugs else 'missing'),
+            }
+        return sample
+
+    def routes(self):
+        for module in (posts_urls, users_urls, about_urls):
+            for pattern in module.urlpatterns:
+                yield (f'{module.app_name}:{pattern.name}',
+                       pattern.pattern.converters.keys())
+
+    def client_for(self, role):
+        client = Client()
+        if role == 'reader':
+            reader = User.objects.order_by(
+                '-counters__following_count').first()
+            client.force_login(reader)
+        return client
+
+    def request(self, client, url, cold):
+        cookies = copy.deepcopy(client.cookies)
+        if cold:
+            cache.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                elapsed = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+        # Выход из аккаунта не должен менять роль для следующих запросов.
+        client.cookies = cookies
+        return elapsed, len(queries), response.status_code
+
+    def measure(self, options):
+        sample = self.kwargs_sampler(options['requests'])
+        results = {}
+        for role in ROLES:
+            client = self.client_for(role)
+            for route, names in self.routes():
+                timings, queries, statuses = [], [], set()
+                for _ in range(options['requests']):
+                    kwargs = sample()
+                    url = reverse(
+                        route, kwargs={name: kwargs[name] for name in names})
+                    elapsed, count, status = self.request(
+                        client, url, options['cold'])
+                    timings.append(elapsed)
+                    queries.append(count)
+                    statuses.add(status)
+                results[f'{route} {role}'] = {
+                    'p50': percentile(timings, 50),
+                    'p95': percentile(timings, 95),
+                    'p99': percentile(timings, 99),
+                    'queries': statistics.mean(queries),
+                    'statuses': sorted(statuses),
+                }
+        return results
+
+    def report(self, results, baseline):
+        self.stdout.write(
+            f'{"route":<36} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"queries":>8}  статусы  (ms)'
+        )
+        for key, row in results.items():
+            line = (
+                f'{key:<36} {row["p50"]:>8.2f} {row["p95"]:>8.2f} '
+                f'{row["p99"]:>8.2f} {row["queries"]:>8.1f}  '
+                f'{",".join(map(str, row["statuses"]))}'
+            )
+            if key in baseline:
+                delta = row['p95'] - baseline[key]['p95']
+                line += f'  Δp95 {delta:+.2f}'
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        baseline = {}
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+        results = self.measure(options)
+        self.report(results, baseline)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as results_file:
+                json.dump(results, results_file, indent=2, sort_keys=True)
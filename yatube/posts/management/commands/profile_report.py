@@ -0,0 +1,59 @@
+import glob
+import os
+import pstats
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.profiling import profile_dir
+
+# Куда относить функцию по пути к файлу; первое совпадение побеждает.
+AREAS = (
+    ('sorl-thumbnail', f'{os.sep}sorl{os.sep}'),
+    ('templates', f'{os.sep}django{os.sep}template{os.sep}'),
+    ('orm', f'{os.sep}django{os.sep}db{os.sep}'),
+    ('django', f'{os.sep}django{os.sep}'),
+    ('python', f'{os.sep}lib{os.sep}python'),
+)
+
+
+def area_of(filename):
+    for area, marker in AREAS:
+        if marker in filename:
+            return area
+    return 'project'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводит дампы профилировщика медленных запросов в список самых '
+        'горячих функций и доли времени по областям: sorl-thumbnail, '
+        'шаблоны, ORM, остальной Django и код проекта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None)
+        parser.add_argument(
+            '--route', default='',
+            help='Только дампы маршрута, например posts:post_detail.'
+        )
+        parser.add_argument(
+            '--sort', choices=('tottime', 'cumulative'), default='tottime')
+        parser.add_argument('--limit', type=int, default=30)
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or profile_dir()
+        pattern = options['route'].replace(':', '.') + '*.prof'
+        paths = sorted(glob.glob(os.path.join(directory, pattern)))
+        if not paths:
+            raise CommandError(f'Нет дампов {pattern} в {directory}')
+        stats = pstats.Stats(*paths, stream=self.stdout)
+        self.stdout.write(f'Дампов: {len(paths)}')
+        areas = Counter()
+        for (filename, _, _), row in stats.stats.items():
+            areas[area_of(filename)] += row[2]
+        total = sum(areas.values()) or 1
+        for area, own in areas.most_common():
+            self.stdout.write(
+                f'{area:<16} {own * 1000:>10.1f} ms {own / total:>7.1%}')
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
@@ -0,0 +1,203 @@
+import json
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from importlib import import_module
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import Resolver404, resolve
+from django.utils.crypto import get_random_string
+
+from posts.models import User
+
+from .bench_views import percentile
+
+CSRF_TOKEN = get_random_string(64)
+
+
+def route_name(path):
+    try:
+        return resolve(path).view_name
+    except Resolver404:
+        return '<unresolved>'
+
+
+def build_environ(record, cookie):
+    """WSGI-окружение для записи {method, path, user, body}."""
+    url = urlsplit(record['path'])
+    method = record.get('method', 'GET').upper()
+    body = record.get('body') or b''
+    content_type = 'application/x-www-form-urlencoded'
+    if isinstance(body, dict):
+        body = urlencode(body, doseq=True)
+    if isinstance(body, str):
+        body = body.encode()
+    cookies = f'{settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}'
+    if cookie:
+        cookies += f'; {settings.SESSION_COOKIE_NAME}={cookie}'
+    return {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_TYPE': content_type,
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_COOKIE': cookies,
+        'HTTP_X_CSRFTOKEN': CSRF_TOKEN,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def replay(record, cookie):
+    """Выполняет запрос через WSGI-приложение из yatube/wsgi.py."""
+    from yatube.wsgi import application
+
+    statuses = []
+    started = time.perf_counter()
+    result = application(
+        build_environ(record, cookie),
+        lambda status, headers, exc_info=None: statuses.append(status),
+    )
+    try:
+        for _ in result:
+            pass
+    finally:
+        # close() шлёт request_finished и возвращает соединение с базой.
+        if hasattr(result, 'close'):
+            result.close()
+    elapsed = (time.perf_counter() - started) * 1000
+    return int(statuses[0].split()[0]), elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Воспроизводит запросы из JSONL-файла против WSGI-приложения '
+        'yatube/wsgi.py с заданной частотой в пуле потоков или процессов '
+        'и печатает пропускную способность и задержки по маршрутам. '
+        'Строка файла: {"method": "GET", "path": "/", "user": "leo", '
+        '"body": {...}}; строки без path пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL-файл с запросами.')
+        parser.add_argument(
+            '--rate', type=float, default=0,
+            help='Запросов в секунду; 0 — без ограничения.'
+        )
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread')
+        parser.add_argument(
+            '--repeat', type=int, default=1,
+            help='Сколько раз проиграть файл.'
+        )
+
+    def load(self, path):
+        records, skipped = [], 0
+        try:
+            with open(path) as records_file:
+                for line in records_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        record = None
+                    if isinstance(record, dict) and record.get('path'):
+                        records.append(record)
+                    elif line.strip():
+                        skipped += 1
+        except OSError as error:
+            raise CommandError(error)
+        return records, skipped
+
+    def login(self, usernames):
+        """Сессии для пользователей из записей, как у Client.force_login."""
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        cookies = {}
+        for user in User.objects.filter(username__in=usernames):
+            session = store()
+            session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            cookies[user.username] = session
+        missing = set(usernames) - set(cookies)
+        if missing:
+            self.stderr.write(
+                'Неизвестные пользователи, запросы пойдут анонимно: '
+                + ', '.join(sorted(missing)))
+        return cookies
+
+    def run(self, records, sessions, options):
+        executor_class = (ThreadPoolExecutor if options['pool'] == 'thread'
+                          else ProcessPoolExecutor)
+        interval = 1 / options['rate'] if options['rate'] else 0
+        # Дочерние процессы не должны унаследовать открытые соединения.
+        connections.close_all()
+        started = time.perf_counter()
+        with executor_class(max_workers=options['workers']) as executor:
+            futures = []
+            for number, record in enumerate(records):
+                delay = started + number * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                session = sessions.get(record.get('user'))
+                futures.append((record, executor.submit(
+                    replay, record,
+                    session.session_key if session else None)))
+            results = [(record, future.result()) for record, future in futures]
+        return results, time.perf_counter() - started
+
+    def report(self, results, duration):
+        routes = defaultdict(list)
+        for record, (status, elapsed) in results:
+            key = (f'{record.get("method", "GET").upper()} '
+                   f'{route_name(urlsplit(record["path"]).path)}')
+            routes[key].append((status, elapsed))
+        self.stdout.write(
+            f'{"route":<34} {"count":>6} {"rps":>8} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"5xx":>5}  (ms)'
+        )
+        for key, rows in sorted(routes.items()):
+            timings = sorted(elapsed for _, elapsed in rows)
+            errors = sum(status >= 500 for status, _ in rows)
+            self.stdout.write(
+                f'{key:<34} {len(rows):>6} {len(rows) / duration:>8.1f} '
+                f'{percentile(timings, 50):>8.2f} '
+                f'{percentile(timings, 95):>8.2f} '
+                f'{percentile(timings, 99):>8.2f} {errors:>5}'
+            )
+        self.stdout.write(
+            f'Всего {len(results)} запросов за {duration:.2f} с, '
+            f'{len(results) / duration:.1f} rps'
+        )
+
+    def handle(self, *args, **options):
+        records, skipped = self.load(options['path'])
+        if skipped:
+            self.stderr.write(f'Пропущено строк без запроса: {skipped}')
+        if not records:
+            raise CommandError('В файле нет записей с полем path.')
+        records *= options['repeat']
+        sessions = self.login({r['user'] for r in records if r.get('user')})
+        try:
+            results, duration = self.run(records, sessions, options)
+        finally:
+            for session in sessions.values():
+                session.delete()
+        self.report(results, duration)
@@ -0,0 +1,207 @@
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import counters, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    'лето море книга город утро кофе дорога друг музыка фото поезд '
+    'работа отпуск кино рецепт сад собака кот гора река вечер'
+).split()
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now/auto_now_add, чтобы задать даты самим."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def power_law_weights(count, alpha):
+    """Накопленные веса рангов 1..count по закону Ципфа."""
+    return list(accumulate(1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками с реалистичным перекосом: число '
+        'подписчиков и активность авторов распределены по степенному '
+        'закону, посты выходят сериями. Вставка идёт через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=2_000_000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона популярности.'
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def bulk(self, model, objects, **kwargs):
+        batch = []
+        total = 0
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                model.objects.bulk_create(batch, **kwargs)
+                total += len(batch)
+                batch = []
+                self.log(f'  {model.__name__}: {total}')
+        model.objects.bulk_create(batch, **kwargs)
+        return total + len(batch)
+
+    def created_ids(self, model, **lookup):
+        """id созданных строк: bulk_create на SQLite их не возвращает,
+        поэтому строки находятся заново по метке запуска."""
+        return list(model.objects.filter(**lookup).order_by('pk').values_list(
+            'pk', flat=True))
+
+    def seed_users(self, count):
+        password = make_password(None)
+        self.bulk(User, (
+            User(username=f'user_{self.marker}_{i}', password=password,
+                 first_name=random.choice(WORDS).title())
+            for i in range(count)
+        ))
+        return self.created_ids(
+            User, username__startswith=f'user_{self.marker}_')
+
+    def seed_groups(self, count):
+        Group.objects.bulk_create(
+            Group(title=f'Группа {self.marker}-{i}',
+                  slug=f'group-{self.marker}-{i}',
+                  description=' '.join(random.choices(WORDS, k=12)))
+            for i in range(count)
+        )
+        return self.created_ids(
+            Group, slug__startswith=f'group-{self.marker}-')
+
+    def post_dates(self, count, days):
+        """Даты постов сериями: пачки по несколько постов с паузами."""
+        start = timezone.now() - timedelta(days=days)
+        mean_gap = days * 86400 / max(count, 1)
+        moment = start
+        dates = []
+        while len(dates) < count:
+            burst = min(random.randint(1, 8), count - len(dates))
+            for _ in range(burst):
+                moment += timedelta(seconds=random.expovariate(1 / 30))
+                dates.append(moment)
+            moment += timedelta(
+                seconds=random.expovariate(1 / (mean_gap * burst)))
+        return dates
+
+    def seed_posts(self, count, authors, groups, days, alpha):
+        author_weights = power_law_weights(len(authors), alpha)
+        group_weights = power_law_weights(len(groups), alpha)
+        dates = self.post_dates(count, days)
+        pub_date = Post._meta.get_field('pub_date')
+        updated = Post._meta.get_field('updated')
+
+        def posts():
+            for i, date in enumerate(dates):
+                group = random.choices(groups, cum_weights=group_weights)[0] \
+                    if groups and random.random() < 0.6 else None
+                yield Post(
+                    text=f'Пост {self.marker}-{i}: '
+                         + ' '.join(random.choices(WORDS, k=30)),
+                    author_id=random.choices(
+                        authors, cum_weights=author_weights)[0],
+                    group_id=group, pub_date=date, updated=date,
+                )
+
+        with explicit_dates(pub_date, updated):
+            self.bulk(Post, posts())
+        return list(
+            Post.objects.filter(text__startswith=f'Пост {self.marker}-')
+            .order_by('pk').values_list('pk', 'pub_date'))
+
+    def seed_comments(self, count, users, posts, alpha):
+        post_weights = power_law_weights(len(posts), alpha)
+        created = Comment._meta.get_field('created')
+        order = list(posts)
+        random.shuffle(order)
+
+        def comments():
+            for _ in range(count):
+                post_id, pub_date = random.choices(
+                    order, cum_weights=post_weights)[0]
+                yield Comment(
+                    post_id=post_id,
+                    author_id=random.choice(users),
+                    text=' '.join(random.choices(WORDS, k=8)),
+                    created=pub_date + timedelta(
+                        minutes=random.expovariate(1 / 120)),
+                )
+
+        with explicit_dates(created):
+            self.bulk(Comment, comments())
+
+    def seed_follows(self, users, mean, alpha):
+        author_weights = power_law_weights(len(users), alpha)
+
+        def follows():
+            for user in users:
+                wanted = min(int(random.expovariate(1 / mean)) + 1,
+                             len(users) - 1)
+                authors = set(random.choices(
+                    users, cum_weights=author_weights, k=wanted))
+                authors.discard(user)
+                for author in authors:
+                    yield Follow(user_id=user, author_id=author)
+
+        self.bulk(Follow, follows(), ignore_conflicts=True)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        alpha = options['alpha']
+        self.marker = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            self.log('Пользователи...')
+            users = self.seed_users(options['users'])
+            self.log('Группы...')
+            groups = self.seed_groups(options['groups'])
+            self.log('Посты...')
+            authors = random.sample(users, len(users))
+            posts = self.seed_posts(
+                options['posts'], authors, groups, options['days'], alpha)
+            self.log('Комментарии...')
+            self.seed_comments(options['comments'], users, posts, alpha)
+            self.log('Подписки...')
+            self.seed_follows(users, options['follows'], alpha)
+            # bulk_create не шлёт сигналов: ленты и счётчики собираем сами.
+            self.log('Ленты подписок...')
+            timeline.rebuild()
+            self.log('Счётчики...')
+            counters.audit(fix=True)
+        cache.clear()
+        self.log('Готово.')
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.querylog import log_path
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводит журнал медленных запросов в топ по суммарному времени: '
+        'число, сумма, среднее и максимум, места вызова и последний план. '
+        'С --truncate журнал забирается целиком (переименованием, так что '
+        'новые записи идут уже в новый файл), и запуск по расписанию даёт '
+        'сводку за каждый период.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=None)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--since', type=float, default=None,
+            help='Только записи за последние N минут.'
+        )
+        parser.add_argument('--truncate', action='store_true')
+
+    def load(self, path, since):
+        try:
+            with open(path) as log_file:
+                lines = log_file.readlines()
+        except FileNotFoundError:
+            raise CommandError(f'Журнал {path} не найден.')
+        cutoff = time.time() - since * 60 if since else 0
+        entries = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry['time'] >= cutoff:
+                entries.append(entry)
+        return entries
+
+    def rollup(self, entries):
+        queries = {}
+        for entry in entries:
+            query = queries.setdefault(entry['sql'], {
+                'count': 0, 'total': 0.0, 'max': 0.0,
+                'sites': Counter(), 'plan': None,
+            })
+            query['count'] += 1
+            query['total'] += entry['ms']
+            query['max'] = max(query['max'], entry['ms'])
+            query['sites'][entry['view'] or entry['site']] += 1
+            query['plan'] = entry['plan'] or query['plan']
+        return sorted(
+            queries.items(), key=lambda item: item[1]['total'], reverse=True)
+
+    def rotate(self, path):
+        """Переименовывает журнал: запись, пришедшая во время сводки,
+        попадёт в новый файл, а не пропадёт при очистке."""
+        rotated = f'{path}.{os.getpid()}.report'
+        try:
+            os.replace(path, rotated)
+        except FileNotFoundError:
+            raise CommandError(f'Журнал {path} не найден.')
+        return rotated
+
+    def handle(self, *args, **options):
+        path = options['log'] or log_path()
+        if options['truncate']:
+            path = self.rotate(path)
+        entries = self.load(path, options['since'])
+        self.stdout.write(f'Медленных запросов: {len(entries)}')
+        for sql, query in self.rollup(entries)[:options['limit']]:
+            self.stdout.write(
+                f'\n{query["total"]:.1f} ms всего, {query["count"]} раз, '
+                f'среднее {query["total"] / query["count"]:.1f} ms, '
+                f'максимум {query["max"]:.1f} ms\n  {sql}'
+            )
+            for site, count in query['sites'].most_common(3):
+                self.stdout.write(f'  {count} × {site}')
+            for step in query['plan'] or ():
+                self.stdout.write(f'    plan: {step}')
+        if options['truncate']:
+            os.remove(path)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.routers import replicas, sync_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплики из REPLICA_DATABASES '
+        'через backup API. С --interval повторяет копирование в цикле.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Период синхронизации в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        aliases = replicas()
+        if not aliases:
+            raise CommandError('REPLICA_DATABASES пуст.')
+        while True:
+            started = time.perf_counter()
+            sync_replicas(aliases)
+            self.stdout.write('{}: {:.0f} ms'.format(
+                ', '.join(aliases), (time.perf_counter() - started) * 1000))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
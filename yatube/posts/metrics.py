@@ -0,0 +1,160 @@
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from core.files import private_file, var_path
+
+# Верхние границы корзин гистограммы задержек, мс.
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+CACHE_NAMESPACES = ('fragment', 'thumbnail', 'page')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+)
+'''
+UPSERT = '''
+INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?)
+ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value
+'''
+
+_lock = threading.Lock()
+_pending = Counter()
+_flushed_at = time.monotonic()
+
+
+def store_path():
+    """Файл общий для всех процессов на машине."""
+    return getattr(settings, 'METRICS_DB', var_path('metrics.sqlite3'))
+
+
+def _connect():
+    connection = sqlite3.connect(private_file(store_path()), timeout=10)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute(SCHEMA)
+    return connection
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def route_of(request):
+    match = request.resolver_match
+    if match is None:
+        # Ответ пришёл из middleware (например, кэша страниц).
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return '<unresolved>'
+    return match.view_name
+
+
+def observe(request, response, timer):
+    """Складывает метрики запроса в буфер процесса."""
+    route = route_of(request)
+    duration = timer.metrics()['total']
+    samples = Counter({
+        ('requests_total', _labels(
+            route=route, method=request.method,
+            status=response.status_code)): 1,
+        ('request_duration_ms_sum', _labels(route=route)): duration,
+        ('request_duration_ms_count', _labels(route=route)): 1,
+        ('db_queries_total', _labels(route=route)): timer.counts['db'],
+    })
+    for bound in LATENCY_BUCKETS:
+        if duration <= bound:
+            samples['request_duration_ms_bucket', _labels(
+                route=route, le=bound)] += 1
+    samples['request_duration_ms_bucket', _labels(
+        route=route, le='+Inf')] += 1
+    for (namespace, result), count in timer.lookups.items():
+        samples['cache_lookups_total', _labels(
+            cache=namespace, result=result)] += count
+    with _lock:
+        _pending.update(samples)
+    if time.monotonic() - _flushed_at >= getattr(
+            settings, 'METRICS_FLUSH_INTERVAL', 5):
+        flush()
+
+
+def flush():
+    """Переносит буфер процесса в общее хранилище SQLite."""
+    global _flushed_at
+    with _lock:
+        samples = list(_pending.items())
+        _pending.clear()
+        _flushed_at = time.monotonic()
+    if not samples:
+        return
+    connection = _connect()
+    try:
+        with connection:
+            connection.executemany(UPSERT, (
+                (name, labels, value)
+                for (name, labels), value in samples))
+    finally:
+        connection.close()
+
+
+def snapshot():
+    """Суммарные метрики всех процессов: {(name, labels): value}."""
+    flush()
+    connection = _connect()
+    try:
+        rows = connection.execute(
+            'SELECT name, labels, value FROM metrics ORDER BY name, labels')
+        return {(name, labels): value for name, labels, value in rows}
+    finally:
+        connection.close()
+
+
+def reset():
+    with _lock:
+        _pending.clear()
+    connection = _connect()
+    try:
+        with connection:
+            connection.execute('DELETE FROM metrics')
+    finally:
+        connection.close()
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else round(value, 3)
+
+
+def render(metrics):
+    """Текстовый формат Prometheus с префиксом yatube_."""
+    types = {
+        'requests_total': 'counter',
+        'request_duration_ms': 'histogram',
+        'db_queries_total': 'counter',
+        'cache_lookups_total': 'counter',
+        'cache_hit_ratio': 'gauge',
+    }
+    lookups = Counter()
+    for (name, labels), value in metrics.items():
+        if name == 'cache_lookups_total':
+            namespace = labels.split('"')[1]
+            lookups[namespace, 'result="hit"' in labels] += value
+    for namespace in CACHE_NAMESPACES:
+        hits = lookups[namespace, True]
+        total = hits + lookups[namespace, False]
+        metrics['cache_hit_ratio', _labels(cache=namespace)] = (
+            hits / total if total else 0)
+    lines = []
+    for family, kind in types.items():
+        lines.append(f'# TYPE yatube_{family} {kind}')
+        for (name, labels), value in sorted(metrics.items()):
+            if name == family or (
+                    kind == 'histogram' and name.startswith(family + '_')):
+                lines.append(f'yatube_{name}{{{labels}}} {_number(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,224 @@
+import hashlib
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import metrics, profiling, routers, stampede, timing, versions
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+PAGE_KEY = 'page_cache:{}'
+timing_logger = logging.getLogger('posts.timing')
+PROFILED_MODULES = ('posts.views',)
+PIN_COOKIE = 'primary_pin'
+STATS_KEYS = {
+    'hit': 'page_cache_stats:hits',
+    'miss': 'page_cache_stats:misses',
+}
+
+
+def tag_page(request, *tags):
+    """Отмечает, от каких сущностей зависит страница (см. versions.bump).
+
+    Версии тегов запоминаются в момент вызова, и страница сохраняется
+    под ними. Поэтому представление отмечает страницу до чтения данных:
+    правка, пришедшая во время рендеринга, не выдаст старую страницу
+    за свежую. Вне кэша страниц (не анонимный GET) вызов ничего не делает.
+    """
+    seen = getattr(request, 'page_cache_tags', None)
+    if seen is None:
+        return
+    new = [tag for tag in dict.fromkeys(tags) if tag not in seen]
+    if new:
+        seen.update(zip(new, versions.get_versions(*new)))
+
+
+def page_tags(page_obj):
+    """Теги постов, авторов и групп, попавших на страницу ленты."""
+    tags = set()
+    for post in page_obj:
+        tags.update((f'post:{post.pk}', f'author:{post.author_id}'))
+        if post.group_id:
+            tags.add(f'group:{post.group_id}')
+    return tags
+
+
+def author_tags(posts):
+    """Теги авторов постов: лента показывает их имена."""
+    return {f'author:{post.author_id}' for post in posts}
+
+
+def _record(outcome):
+    key = STATS_KEYS[outcome]
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def page_cache_stats():
+    values = cache.get_many(STATS_KEYS.values())
+    hits = values.get(STATS_KEYS['hit'], 0)
+    misses = values.get(STATS_KEYS['miss'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэш целых страниц для анонимных GET-запросов.
+
+    Страница хранится вместе с версиями своих тегов и считается
+    устаревшей, как только сигнал поднял версию любого из них, поэтому
+    сохранение поста, комментария, группы или подписки сбрасывает только
+    зависящие от них страницы. Пересчитывает устаревшую страницу один
+    запрос, остальные пока получают прежнюю (см. posts.stampede).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def cacheable(self, request):
+        return (
+            request.method == 'GET'
+            and not request.user.is_authenticated
+        )
+
+    def key(self, request):
+        path = request.get_full_path().encode()
+        return PAGE_KEY.format(hashlib.md5(path).hexdigest())
+
+    def __call__(self, request):
+        if not self.cacheable(request):
+            return self.get_response(request)
+        request.page_cache_tags = {}
+
+        def render():
+            response = self.get_response(request)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            return sorted(request.page_cache_tags), response
+
+        def snapshot(entry):
+            return '.'.join(request.page_cache_tags[tag] for tag in entry[0])
+
+        def cacheable(entry):
+            tags, response = entry
+            return bool(
+                tags and response.status_code == 200 and not response.cookies)
+
+        (_, response), computed = stampede.get_or_set(
+            self.key(request), render, PAGE_CACHE_TIMEOUT,
+            version=lambda entry: versions.get_version(*entry[0]),
+            cacheable=cacheable,
+            stamp=snapshot,
+        )
+        if computed:
+            _record('miss')
+            return response
+        _record('hit')
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(
+                response.get('Last-Modified', '')),
+            response=response,
+        )
+
+
+class ServerTimingMiddleware:
+    """Заголовок Server-Timing и строка лога со временем запроса.
+
+    Время делится на запросы к базе (db), рендеринг шаблонов (tpl),
+    обращения к кэшу (cache) и остальной код (view). Строка пишется в
+    логгер posts.timing с уровнем INFO, поля продублированы в extra.
+    Те же замеры копятся в posts.metrics для эндпоинта /metrics/.
+    Ставится первым в MIDDLEWARE, чтобы учесть и остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        timing.instrument()
+
+    def __call__(self, request):
+        timer = timing.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timing.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            timing.stop()
+        response['Server-Timing'] = timer.header()
+        metrics.observe(request, response, timer)
+        if timing_logger.isEnabledFor(logging.INFO):
+            fields = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **{kind: round(value, 2)
+                   for kind, value in timer.metrics().items()},
+                **{f'{kind}_count': count
+                   for kind, count in timer.counts.items()},
+            }
+            timing_logger.info(
+                ' '.join(f'{key}={value}' for key, value in fields.items()),
+                extra={'server_timing': fields},
+            )
+        return response
+
+
+class SlowRequestProfilerMiddleware:
+    """Сэмплирующий профилировщик представлений из PROFILED_MODULES.
+
+    Дамп pstats пишется в PROFILER_DIR, если запрос оказался медленным
+    или попал в случайную выборку; см. команду profile_report.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if view_func.__module__ in PROFILED_MODULES:
+            request.profile = profiling.start()
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            profile = getattr(request, 'profile', None)
+            if profile is not None:
+                profiling.finish(profile, request.resolver_match.view_name)
+
+
+class ReplicaPinMiddleware:
+    """Чтение своих записей при работе с репликами.
+
+    Запрос, который что-то записал, ставит куку на REPLICA_PIN_SECONDS;
+    пока она жива, PrimaryReplicaRouter читает из default. Ставится
+    раньше SessionMiddleware, чтобы видеть и запись сессии.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.start_request(pinned=PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.finish_request()
+        if wrote and routers.replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=routers.pin_seconds(),
+                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    UserCounters = apps.get_model('posts', 'UserCounters')
+    # Каждый счётчик — отдельным запросом: общий JOIN трёх связей
+    # перемножил бы строки.
+    counters = {}
+    for field, relation in (('posts_count', 'posts'),
+                            ('followers_count', 'following'),
+                            ('following_count', 'follower')):
+        rows = User.objects.annotate(
+            value=Count(relation)).values_list('pk', 'value')
+        for user_id, value in rows:
+            counters.setdefault(user_id, {})[field] = value
+    # Повторный запуск (см. 0009) пересчитывает счётчики заново.
+    UserCounters.objects.all().delete()
+    UserCounters.objects.bulk_create(
+        (UserCounters(user_id=user_id, **values)
+         for user_id, values in counters.items()),
+        batch_size=500,
+    )
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+    Post.objects.update(comments_count=Coalesce(Subquery(
+        comments.values('post').annotate(total=Count('pk')).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0006_auto_20261018_0357'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:06
+
+import core.fields
+from django.db import migrations, models
+
+from core.fields import content_hash
+
+BATCH_SIZE = 1000
+
+
+def fill_text_hash(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    last_pk = 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'text')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for post in batch:
+            post.text_hash = content_hash(post.text)
+        Post.objects.bulk_update(batch, ['text_hash'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_auto_20261018_0405'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='text_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, verbose_name='Хэш текста'),
+        ),
+        migrations.RunPython(fill_text_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='post',
+            name='text_hash',
+            field=core.fields.ContentHashField(editable=False, source='text', unique=True, verbose_name='Хэш текста'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text',
+            field=models.TextField(verbose_name='Текст'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.db import models
 
+from core.fields import ContentHashField, content_hash
+
 User = get_user_model()
 
 
@@ -16,9 +19,24 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    # Всё, что читают карточки постов в шаблонах лент.
+    FEED_FIELDS = (
+        'text', 'pub_date', 'image', 'comments_count', 'author_id',
+        'group_id', 'author__username', 'author__first_name',
+        'author__last_name', 'group__title', 'group__slug',
+    )
+
+    def for_feed(self):
+        """Посты для ленты: автор и группа одним JOIN, только нужные поля."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+
 class Post(models.Model):
-    text = models.TextField('Текст', unique=True)
+    text = models.TextField('Текст')
+    text_hash = ContentHashField('Хэш текста', source='text', unique=True)
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -39,15 +57,74 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_feed_idx'),
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_feed_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_feed_idx'
+            ),
+            models.Index(
+                fields=['author', 'updated'], name='post_author_updated_idx'
+            ),
+            models.Index(
+                fields=['group', 'updated'], name='post_group_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def validate_unique(self, exclude=None):
+        """Проверяет и уникальность текста.
+
+        Её держит индекс по text_hash, а это поле не входит ни в одну
+        форму, и без этой проверки повтор текста доходил бы до
+        IntegrityError. Проверка — один поиск по индексу.
+        """
+        super().validate_unique(exclude)
+        if exclude and 'text' in exclude:
+            return
+        duplicates = Post.objects.filter(text_hash=content_hash(self.text))
+        if self.pk:
+            duplicates = duplicates.exclude(pk=self.pk)
+        if duplicates.exists():
+            raise ValidationError({'text': ValidationError(
+                'Пост с таким текстом уже существует.', code='unique')})
+
+    # Счётчики меняет только UPDATE с F() (см. counters.bump_post).
+    COUNTER_FIELDS = ('comments_count',)
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        """Сохраняет пост, не перезаписывая счётчики уже созданного поста.
+
+        В экземпляре, прочитанном до нового комментария, comments_count
+        устарел, и полное сохранение (например, при правке) затёрло бы
+        значение, увеличенное в базе.
+        """
+        if (update_fields is None and not force_insert
+                and not self._state.adding):
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -65,6 +142,13 @@ class Comment(models.Model):
     text = models.TextField('Текст', help_text='Текст нового комментария')
     created = models.DateTimeField('Дата публикации', auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -79,3 +163,77 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='создатель поста'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
+
+
+class UserCounters(models.Model):
+    """Денормализованные счётчики пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор поста'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_feed_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'
+            ),
+        ]
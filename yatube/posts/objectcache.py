@@ -0,0 +1,120 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Manager
+from django.shortcuts import get_object_or_404 as get_from_db_or_404
+
+from . import routers, versions
+from .models import Group, Post
+
+OBJECT_CACHE_TIMEOUT = getattr(settings, 'OBJECT_CACHE_TIMEOUT', 60 * 15)
+OBJECT_KEY = 'object:{}'
+
+
+def _post_scopes(post):
+    scopes = [f'post:{post.pk}', f'author:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
+
+
+# Поле поиска и области версий (см. versions.bump в signals) для моделей,
+# которые можно брать из кэша.
+CACHED_LOOKUPS = {
+    Post: ('pk', _post_scopes),
+    Group: ('slug', lambda group: [f'group:{group.pk}']),
+    get_user_model(): ('username', lambda user: [f'author:{user.pk}']),
+}
+
+# Поля, которые не кладутся в общий кэш ни у самой модели, ни у
+# связанной через select_related: закэшированный объект догрузит их из
+# базы при обращении.
+PRIVATE_FIELDS = {
+    get_user_model(): ('password', 'email', 'last_login'),
+}
+
+
+def _queryset(klass):
+    if isinstance(klass, Manager):
+        return klass.all()
+    if hasattr(klass, '_default_manager'):
+        return klass._default_manager.all()
+    return klass
+
+
+def _without_private(queryset):
+    """queryset с отложенными PRIVATE_FIELDS или None, если связи
+    select_related не перечислены явно."""
+    related = queryset.query.select_related
+    if related is True:
+        return None
+    deferred = []
+
+    def walk(model, tree, prefix):
+        deferred.extend(prefix + name for name in PRIVATE_FIELDS.get(
+            model, ()))
+        for name, subtree in tree.items():
+            walk(model._meta.get_field(name).related_model, subtree,
+                 f'{prefix}{name}__')
+
+    walk(queryset.model, related or {}, '')
+    return queryset.defer(*deferred) if deferred else queryset
+
+
+def _cache_key(queryset, args, kwargs):
+    """Ключ кэша или None, если поиск не кэшируется."""
+    lookup = CACHED_LOOKUPS.get(queryset.model)
+    query = queryset.query
+    if (lookup is None or args or len(kwargs) != 1 or query.has_filters()
+            or query.annotations or query.extra or query.distinct):
+        return None
+    [(name, value)] = kwargs.items()
+    names = {lookup[0]}
+    if lookup[0] == 'pk':
+        names.add(queryset.model._meta.pk.attname)
+    if name not in names:
+        return None
+    deferred, defer = query.deferred_loading
+    fingerprint = repr((
+        queryset.model._meta.label_lower, lookup[0], str(value),
+        query.select_related, sorted(deferred), defer,
+    ))
+    return OBJECT_KEY.format(hashlib.md5(fingerprint.encode()).hexdigest())
+
+
+def get_object_or_404(klass, *args, **kwargs):
+    """get_object_or_404 с кэшем для Post по pk, Group по slug и User
+    по username.
+
+    Объект лежит в кэше вместе с версиями своих областей и считается
+    устаревшим, как только сигнал сохранения или удаления поднял любую
+    из них, поэтому изменения поста, комментариев, автора, счётчиков или
+    группы сразу видны. Пароль, почта и время входа пользователей в кэш
+    не попадают (PRIVATE_FIELDS). Остальные запросы идут в базу как
+    обычно.
+    """
+    queryset = _queryset(klass)
+    public = _without_private(queryset)
+    key = None if public is None else _cache_key(public, args, kwargs)
+    if key is None:
+        return get_from_db_or_404(queryset, *args, **kwargs)
+    queryset = public
+    entry = cache.get(key)
+    scopes = version = None
+    if entry is not None:
+        scopes, stored, obj = entry
+        version = versions.get_version(*scopes)
+        if version == stored:
+            return obj
+    # Версия читается до объекта: правка, пришедшая между ними, сделает
+    # запись устаревшей. Области нового объекта пока неизвестны — он
+    # ляжет без версии, а с версией его положит следующий промах.
+    with routers.primary_reads():
+        obj = get_from_db_or_404(queryset, *args, **kwargs)
+    found = CACHED_LOOKUPS[queryset.model][1](obj)
+    if found != scopes:
+        version = None
+    cache.set(key, (found, version, obj), OBJECT_CACHE_TIMEOUT)
+    return obj
@@ -0,0 +1,217 @@
+from collections.abc import Sequence
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.encoding import force_bytes, force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+POSTS_PER_PAGE = getattr(settings, 'POSTS_PER_PAGE', 10)
+
+
+def encode_cursor(post):
+    value = f'{post.pub_date.isoformat()}|{post.pk}'
+    return urlsafe_base64_encode(force_bytes(value))
+
+
+def decode_cursor(cursor):
+    """Возвращает (pub_date, pk) или None для испорченного курсора."""
+    try:
+        pub_date, pk = force_str(urlsafe_base64_decode(cursor)).split('|')
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (TypeError, ValueError):
+        return None
+
+
+class LazyRows(Sequence):
+    """Строки страницы, которые выбираются из базы при первом обращении.
+
+    Пока шаблон берёт ленту из кэша фрагмента, запрос к базе не выполняется.
+    """
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+
+    @cached_property
+    def rows(self):
+        return list(self._fetch())
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+def next_cursor(page):
+    """Курсор следующей страницы или None."""
+    if page.has_next() and len(page):
+        return encode_cursor(page[-1])
+    return None
+
+
+def previous_cursor(page):
+    """Курсор предыдущей страницы или None."""
+    if page.has_previous() and len(page):
+        return encode_cursor(page[0])
+    return None
+
+
+def with_cursors(page, has_next=None, has_previous=None):
+    """Добавляет странице ленивые `next_cursor()` и `previous_cursor()`.
+
+    `has_next` и `has_previous` подменяют одноимённые методы Page, когда
+    соседние страницы известны без COUNT(*). Страница остаётся Page, а
+    шаблоны вызывают эти атрибуты как обычные методы.
+    """
+    if has_next is not None:
+        page.has_next = has_next
+    if has_previous is not None:
+        page.has_previous = has_previous
+    page.next_cursor = partial(next_cursor, page)
+    page.previous_cursor = partial(previous_cursor, page)
+    return page
+
+
+class CursorPage(Page):
+    """Страница, выбранная по курсору: без OFFSET и без COUNT(*).
+
+    Номер страницы неизвестен, поэтому соседние страницы доступны только
+    через курсоры `next_cursor()` и `previous_cursor()`.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        with_cursors(self, has_next, has_previous)
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class KeysetPaginator(Paginator):
+    """Пагинатор ленты постов по ключу (pub_date, pk).
+
+    `get_page(number)` работает как у обычного Paginator и оставляет
+    рабочими ссылки вида `?page=N`; `get_cursor_page()` выбирает страницу
+    диапазонным запросом по индексу, не считая строки и не используя OFFSET.
+    """
+
+    key_fields = ('pub_date', 'pk')
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page=POSTS_PER_PAGE, **kwargs):
+        super().__init__(self.order(object_list), per_page, **kwargs)
+
+    def order(self, object_list):
+        date_field, pk_field = self.key_fields
+        return object_list.order_by(f'-{date_field}', f'-{pk_field}')
+
+    def get_items(self, rows):
+        """Превращает строки выборки в элементы страницы."""
+        return rows
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей, первые и последние, с многоточием.
+
+        Повторяет Paginator.get_elided_page_range из Django 3.2: разметка
+        пагинатора не растёт вместе с числом страниц.
+        """
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def _get_page(self, object_list, number, paginator):
+        items = LazyRows(lambda: self.get_items(list(object_list)))
+        page = with_cursors(Page(items, number, paginator))
+        page.elided_page_range = list(self.get_elided_page_range(number))
+        return page
+
+    def _older_than(self, pub_date, pk):
+        date_field, pk_field = self.key_fields
+        return Q(**{f'{date_field}__lt': pub_date}) | Q(**{
+            date_field: pub_date, f'{pk_field}__lt': pk})
+
+    def _newer_than(self, pub_date, pk):
+        date_field, pk_field = self.key_fields
+        return Q(**{f'{date_field}__gt': pub_date}) | Q(**{
+            date_field: pub_date, f'{pk_field}__gt': pk})
+
+    def rows_after(self, key, limit):
+        """Строки ленты старше ключа (или с начала ленты), по убыванию."""
+        queryset = self.object_list
+        if key is not None:
+            queryset = queryset.filter(self._older_than(*key))
+        return list(queryset[:limit])
+
+    def rows_before(self, key, limit):
+        """Последние `limit` строк новее ключа, по убыванию."""
+        date_field, pk_field = self.key_fields
+        rows = list(
+            self.object_list.filter(self._newer_than(*key))
+            .order_by(date_field, pk_field)[:limit]
+        )
+        return rows[::-1]
+
+    def get_cursor_page(self, after=None, before=None):
+        """Страница по курсору; без курсоров — первая страница ленты.
+
+        Первая страница остаётся обычной Page с номером 1, но, как и
+        остальные страницы по курсору, не считает строки: о следующей
+        странице говорит лишняя, (per_page + 1)-я строка выборки.
+        """
+        limit = self.per_page + 1
+        if before is not None:
+            rows = LazyRows(partial(self.rows_before, before, limit))
+            items = LazyRows(
+                lambda: self.get_items(rows[-self.per_page:]))
+            return CursorPage(
+                items, self, lambda: True, lambda: len(rows) > self.per_page)
+        rows = LazyRows(partial(self.rows_after, after, limit))
+        items = LazyRows(lambda: self.get_items(rows[:self.per_page]))
+
+        def has_next():
+            return len(rows) > self.per_page
+
+        if after is None:
+            return with_cursors(Page(items, 1, self), has_next, lambda: False)
+        return CursorPage(items, self, has_next, lambda: True)
+
+    def paginate(self, request):
+        """Страница ленты по параметрам запроса `after`, `before`, `page`."""
+        for param in ('after', 'before'):
+            key = decode_cursor(request.GET.get(param, ''))
+            if key is not None:
+                return self.get_cursor_page(**{param: key})
+        # COUNT(*) нужен только для явного номера страницы.
+        if request.GET.get('page'):
+            return self.get_page(request.GET.get('page'))
+        return self.get_cursor_page()
+
+
+def paginate(request, post_list, paginator_class=KeysetPaginator):
+    return paginator_class(post_list).paginate(request)
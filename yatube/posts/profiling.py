@@ -0,0 +1,133 @@
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from core.files import private_opener, var_path
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def profile_dir():
+    return _setting('PROFILER_DIR', var_path('profiles'))
+
+
+def _key(code):
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class Profile:
+    """Статистика стеков одного запроса, снятых сэмплером."""
+
+    def __init__(self, thread_id, sampled):
+        self.thread_id = thread_id
+        self.sampled = sampled
+        self.interval = _setting('PROFILER_INTERVAL', 0.005)
+        self.started = time.perf_counter()
+        self.duration = None
+        self.samples = 0
+        self.own = Counter()
+        self.cumulative = Counter()
+        self.callers = defaultdict(Counter)
+
+    def sample(self, frame):
+        keys = []
+        while frame is not None:
+            keys.append(_key(frame.f_code))
+            frame = frame.f_back
+        self.samples += 1
+        self.own[keys[0]] += 1
+        self.cumulative.update(set(keys))
+        for callee, caller in set(zip(keys, keys[1:])):
+            self.callers[callee][caller] += 1
+
+    def stats(self):
+        """Словарь в формате pstats; число вызовов — число сэмплов."""
+        interval = self.interval
+        return {
+            key: (count, count, self.own[key] * interval, count * interval, {
+                caller: (calls, calls, calls * interval, calls * interval)
+                for caller, calls in self.callers[key].items()
+            })
+            for key, count in self.cumulative.items()
+        }
+
+    def dump(self, route):
+        os.makedirs(profile_dir(), mode=0o700, exist_ok=True)
+        name = '{}-{}ms-{}-{}.prof'.format(
+            route.replace(':', '.'), int(self.duration * 1000),
+            time.strftime('%Y%m%d%H%M%S'), os.getpid())
+        path = os.path.join(profile_dir(), name)
+        with open(path, 'wb', opener=private_opener) as dump_file:
+            marshal.dump(self.stats(), dump_file)
+        return path
+
+
+class Sampler:
+    """Фоновый поток, который снимает стеки профилируемых потоков.
+
+    Поток живёт, пока есть хотя бы один профилируемый запрос.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.thread = None
+
+    def start(self, profile):
+        with self.lock:
+            self.active[profile.thread_id] = profile
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='profiler-sampler', daemon=True)
+                self.thread.start()
+
+    def stop(self, profile):
+        with self.lock:
+            self.active.pop(profile.thread_id, None)
+        profile.duration = time.perf_counter() - profile.started
+
+    def run(self):
+        while True:
+            time.sleep(_setting('PROFILER_INTERVAL', 0.005))
+            with self.lock:
+                if not self.active:
+                    self.thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, profile in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile.sample(frame)
+
+
+sampler = Sampler()
+
+
+def start():
+    """Начинает профилировать текущий поток.
+
+    Каждый PROFILER_SAMPLE_RATE-й в среднем запрос сохраняется всегда,
+    остальные — только если дольше PROFILER_SLOW_MS.
+    """
+    rate = _setting('PROFILER_SAMPLE_RATE', 100)
+    profile = Profile(
+        threading.get_ident(), bool(rate) and random.random() < 1 / rate)
+    sampler.start(profile)
+    return profile
+
+
+def finish(profile, route):
+    """Останавливает профиль и возвращает путь к дампу, если он записан."""
+    sampler.stop(profile)
+    slow = profile.duration * 1000 >= _setting('PROFILER_SLOW_MS', 500)
+    if profile.samples and (slow or profile.sampled):
+        return profile.dump(route)
+    return None
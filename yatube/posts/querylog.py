@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from core.files import private_file, var_path
+
+logger = logging.getLogger('posts.slow_queries')
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SKIP_FILES = (__file__, os.path.join('posts', 'timing.py'))
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def log_path():
+    return getattr(settings, 'SLOW_QUERY_LOG', var_path('slow-queries.jsonl'))
+
+
+def normalize(sql):
+    """SQL без значений: литералы и параметры заменены на ?."""
+    sql = _LITERALS.sub('?', sql.replace('%s', '?'))
+    return ' '.join(_IN_LISTS.sub('(...)', sql).split())
+
+
+def call_sites():
+    """Ближайшая строка кода проекта и строка в views.py, если есть."""
+    site = view = None
+    frame = sys._getframe(2)
+    while frame is not None and view is None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(settings.BASE_DIR)
+                and not filename.endswith(_SKIP_FILES)):
+            where = '{}:{} in {}'.format(
+                os.path.relpath(filename, settings.BASE_DIR),
+                frame.f_lineno, frame.f_code.co_name)
+            site = site or where
+            if filename.endswith('views.py'):
+                view = where
+        frame = frame.f_back
+    return site, view
+
+
+def explain(connection, sql, params):
+    if connection.vendor != 'sqlite' or not sql.lstrip().upper().startswith(
+            ('SELECT', 'WITH')):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def record(sql, params, duration, connection):
+    site, view = call_sites()
+    entry = {
+        'time': time.time(),
+        'ms': round(duration * 1000, 2),
+        'sql': normalize(sql),
+        'site': site,
+        'view': view,
+        'plan': explain(connection, sql, params),
+    }
+    logger.warning(
+        'slow query %.1f ms at %s: %s', entry['ms'], site, entry['sql'],
+        extra={'slow_query': entry},
+    )
+    line = json.dumps(entry, ensure_ascii=False) + '\n'
+    with _write_lock, open(private_file(log_path()), 'a') as log_file:
+        log_file.write(line)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Пишет в журнал запросы дольше SLOW_QUERY_MS вместе с их планом.
+
+    Подключается ко всем соединениям сигналом connection_created.
+    """
+    if getattr(_local, 'busy', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if duration * 1000 >= getattr(settings, 'SLOW_QUERY_MS', 100):
+        _local.busy = True
+        try:
+            record(sql, None if many else params, duration,
+                   context['connection'])
+        except Exception:
+            logger.exception('slow query log failed')
+        finally:
+            _local.busy = False
+    return result
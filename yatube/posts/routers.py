@@ -0,0 +1,92 @@
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICATED_APPS = ('posts',)
+
+_local = threading.local()
+
+
+def replicas():
+    return list(getattr(settings, 'REPLICA_DATABASES', ()))
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+
+
+def start_request(pinned):
+    _local.pinned = pinned
+    _local.wrote = False
+
+
+def finish_request():
+    """Была ли запись за время запроса; сбрасывает состояние потока."""
+    wrote = getattr(_local, 'wrote', False)
+    _local.__dict__.clear()
+    return wrote
+
+
+def note_write():
+    """Отмечает запись в текущем запросе, даже сделанную другим потоком."""
+    _local.wrote = True
+
+
+@contextmanager
+def primary_reads():
+    """Чтение внутри блока — с default, как после записи.
+
+    Так читают всё, что ложится в общий кэш под текущими версиями:
+    версию уже поднял сигнал записи, и данные с отстающей реплики
+    остались бы в кэше свежими и после sync_replicas.
+    """
+    pinned = getattr(_local, 'pinned', False)
+    _local.pinned = True
+    try:
+        yield
+    finally:
+        _local.pinned = pinned
+
+
+class PrimaryReplicaRouter:
+    """Запись — в default, чтение моделей posts — с реплик.
+
+    После записи чтение в этом же запросе и в запросах того же браузера
+    в течение REPLICA_PIN_SECONDS идёт с default (см.
+    ReplicaPinMiddleware), так что автор сразу видит свой пост. Значения
+    для общего кэша тоже читаются с default (см. primary_reads).
+    """
+
+    def db_for_read(self, model, **hints):
+        if (model._meta.app_label not in REPLICATED_APPS
+                or getattr(_local, 'pinned', False)
+                or getattr(_local, 'wrote', False)):
+            return DEFAULT_DB_ALIAS
+        aliases = replicas()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        note_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
+
+
+def sync_replicas(aliases=None):
+    """Копирует default в реплики через backup API SQLite."""
+    primary = connections[DEFAULT_DB_ALIAS]
+    primary.ensure_connection()
+    for alias in aliases or replicas():
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
@@ -0,0 +1,123 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import routers, timing
+
+ENTRY_KEY = 'stampede:{}'
+LEASE_KEY = 'stampede_lease:{}'
+FRESH, STALE = 'fresh', 'stale'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _current(version, value):
+    return version(value) if callable(version) else version
+
+
+def state(entry, version=None):
+    """FRESH, STALE или None для записи (value, version, delta, expires).
+
+    Запись устаревает, когда не совпала версия или подошёл срок. Срок
+    проверяется с вероятностным опережением (XFetch): чем дольше
+    считалось значение и чем ближе срок, тем вероятнее, что пересчёт
+    начнётся заранее и одним запросом, а не всеми сразу по истечении.
+    """
+    if entry is None:
+        return None
+    value, stored_version, delta, expires = entry
+    if stored_version != _current(version, value):
+        return STALE
+    if expires is None:
+        return FRESH
+    beta = _setting('STAMPEDE_BETA', 1.0)
+    early = -delta * beta * math.log(1 - random.random())
+    return FRESH if time.time() + early < expires else STALE
+
+
+def acquire(key, timeout=None):
+    """Право на пересчёт key: одно на все процессы, пока не истечёт
+    (через timeout секунд, по умолчанию STAMPEDE_LEASE_TIMEOUT)."""
+    if timeout is None:
+        timeout = _setting('STAMPEDE_LEASE_TIMEOUT', 30)
+    return cache.add(LEASE_KEY.format(key), 1, timeout)
+
+
+def release(key):
+    cache.delete(LEASE_KEY.format(key))
+
+
+def store(key, value, timeout, version=None, delta=0.0):
+    """Кладёт значение; устаревшим его отдают ещё STAMPEDE_STALE_TTL."""
+    if timeout is None:
+        expires = backend_timeout = None
+    else:
+        expires = time.time() + timeout
+        backend_timeout = timeout + _setting('STAMPEDE_STALE_TTL', 300)
+    cache.set(
+        ENTRY_KEY.format(key),
+        (value, _current(version, value), delta, expires),
+        backend_timeout,
+    )
+
+
+def _wait(key, version):
+    deadline = time.monotonic() + _setting('STAMPEDE_WAIT', 5)
+    while time.monotonic() < deadline:
+        time.sleep(_setting('STAMPEDE_POLL', 0.05))
+        entry = cache.get(ENTRY_KEY.format(key))
+        if entry is not None and entry[1] == _current(version, entry[0]):
+            return entry
+        if cache.get(LEASE_KEY.format(key)) is None:
+            # Пересчёт закончился, но значение не попало в кэш.
+            return None
+    return None
+
+
+def get_or_set(key, compute, timeout, version=None, cacheable=None,
+               stamp=None):
+    """Значение из кэша или compute() — но пересчитывает один запрос.
+
+    version — значение или функция от закэшированного значения;
+    несовпадение версии делает запись устаревшей. Пока один запрос
+    пересчитывает, остальные получают устаревшее значение, а если его
+    нет — ждут до STAMPEDE_WAIT секунд и только потом считают сами.
+    cacheable(value) решает, класть ли посчитанное значение в кэш,
+    stamp(value) — под какой версией (по умолчанию под текущей).
+    compute() читает с основной базы (см. routers.primary_reads).
+    Возвращает пару (value, computed).
+    """
+    entry = cache.get(ENTRY_KEY.format(key))
+    entry_state = state(entry, version)
+    get_shared = getattr(cache, 'get_shared', None)
+    if entry_state == STALE and get_shared is not None:
+        # Устаревшей может быть только копия процесса (L1 в
+        # TwoTierCache): другой процесс уже положил свежую в общий кэш.
+        entry = get_shared(ENTRY_KEY.format(key))
+        entry_state = state(entry, version)
+    timing.lookup(key, entry_state == FRESH)
+    if entry_state == FRESH:
+        return entry[0], False
+    leader = acquire(key)
+    if not leader:
+        if entry is None:
+            entry = _wait(key, version)
+        if entry is not None:
+            return entry[0], False
+    try:
+        started = time.perf_counter()
+        with routers.primary_reads():
+            value = compute()
+        if cacheable is None or cacheable(value):
+            store(key, value, timeout,
+                  version if stamp is None else stamp(value),
+                  time.perf_counter() - started)
+    finally:
+        if leader:
+            release(key)
+    return value, True
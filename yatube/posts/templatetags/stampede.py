@@ -0,0 +1,89 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from .. import stampede, versions
+from ..middleware import tag_page
+
+register = template.Library()
+
+
+class StampedeCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, vary_on, version,
+                 tags=None):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.version = version
+        self.tags = tags
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    f'"stampede_cache" tag got a non-integer timeout '
+                    f'value: {timeout!r}')
+        key = make_template_fragment_key(
+            self.fragment_name,
+            [var.resolve(context) for var in self.vary_on])
+        version = None
+        if self.version is not None:
+            version = self.version.resolve(context)
+        if self.tags is None:
+            value, _ = stampede.get_or_set(
+                key, lambda: self.nodelist.render(context), timeout, version)
+            return value
+
+        def compute():
+            # Теги известны только после рендеринга: это, например,
+            # авторы постов, попавших во фрагмент.
+            content = self.nodelist.render(context)
+            return content, sorted(self.tags.resolve(context))
+
+        def current(value):
+            return f'{version}.{versions.get_version(*value[1])}'
+
+        # Свой ключ: под прежним лежит фрагмент без тегов.
+        (content, tags), _ = stampede.get_or_set(
+            f'{key}:tags', compute, timeout, current)
+        if 'request' in context:
+            tag_page(context['request'], *tags)
+        return content
+
+
+@register.tag
+def stampede_cache(parser, token):
+    """Как {% cache %}, но через posts.stampede: фрагмент пересчитывает
+    один запрос, остальные тем временем получают прежнюю версию.
+
+        {% stampede_cache 500 sidebar request.user.pk version=v %}
+        ...
+        {% endstampede_cache %}
+
+    version= не входит в ключ: после смены версии старый фрагмент
+    отдаётся, пока новый не готов. tags= вычисляется после рендеринга
+    фрагмента и даёт теги versions, от которых он ещё зависит: фрагмент
+    хранится вместе с ними, устаревает при bump любого из них и
+    добавляет их к тегам страницы (см. middleware.tag_page).
+    """
+    nodelist = parser.parse(('endstampede_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    options = {}
+    while len(tokens) > 3 and tokens[-1].startswith(('version=', 'tags=')):
+        name, value = tokens.pop().split('=', 1)
+        options[name] = parser.compile_filter(value)
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments.")
+    return StampedeCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        options.get('version'),
+        options.get('tags'),
+    )
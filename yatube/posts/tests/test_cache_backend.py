@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase
+
+from core.backends.cache import SQLiteCache, TwoTierCache
+
+from .. import feeds, versions
+
+SHARED_KEY_PREFIXES = (
+    settings.CACHES['default']['OPTIONS']['SHARED_KEY_PREFIXES'])
+
+
+def worker_cache(name, **options):
+    """Кэш ещё одного процесса: свой L1 поверх общего L2."""
+    return TwoTierCache(name, {'OPTIONS': {
+        'L2': 'shared', 'SHARED_KEY_PREFIXES': SHARED_KEY_PREFIXES,
+        **options,
+    }})
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.cache = self.backend()
+
+    def backend(self, **options):
+        backend = SQLiteCache(self.path, {'OPTIONS': options})
+        self.addCleanup(lambda: backend.connection.close())
+        return backend
+
+    def test_values_and_expiry(self):
+        self.cache.set('post', {'text': 'Пост'})
+        self.cache.set('gone', 1, 0)
+        self.assertEqual(self.cache.get('post'), {'text': 'Пост'})
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertEqual(
+            self.cache.get_many(['post', 'gone', 'missing']),
+            {'post': {'text': 'Пост'}})
+        self.assertTrue(self.cache.add('gone', 2))
+        self.assertFalse(self.cache.add('gone', 3))
+        self.assertEqual(self.cache.get('gone'), 2)
+        self.assertTrue(self.cache.touch('gone', 0))
+        self.assertIsNone(self.cache.get('gone'))
+        self.cache.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+
+    def test_file_is_private(self):
+        self.cache.set('post', 'Пост')
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_tests_use_their_own_file(self):
+        self.assertTrue(caches['shared'].path.startswith(settings.VAR_DIR))
+        self.assertNotEqual(
+            settings.VAR_DIR, os.path.join(settings.BASE_DIR, 'var'))
+
+    def test_incr_is_atomic_between_connections(self):
+        self.cache.set('counter', 0)
+        backends = [self.backend() for _ in range(8)]
+
+        def work(backend):
+            for _ in range(50):
+                backend.incr('counter')
+
+        threads = [threading.Thread(target=work, args=(backend,))
+                   for backend in backends]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 400)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_cull(self):
+        backend = self.backend(MAX_ENTRIES=50, CULL_FREQUENCY=2)
+        for number in range(100):
+            backend.set(f'key:{number}', number)
+        count = backend.connection.execute(
+            'SELECT COUNT(*) FROM cache').fetchone()[0]
+        self.assertLessEqual(count, 50)
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.other = worker_cache('other-worker')
+        self.other.clear()
+        cache.clear()
+
+    def test_reads_are_served_from_l1(self):
+        cache.set('post', 'Пост')
+        caches['shared'].delete('post')
+        self.assertEqual(cache.get('post'), 'Пост')
+        self.assertIsNone(self.other.get('post'))
+
+    def test_l1_entries_expire(self):
+        worker = worker_cache('short-worker', L1_TIMEOUT=0.05)
+        worker.set('post', 'Пост')
+        self.other.set('post', 'Новый пост')
+        self.assertEqual(worker.get('post'), 'Пост')
+        time.sleep(0.1)
+        self.assertEqual(worker.get('post'), 'Новый пост')
+
+    def test_l1_is_bounded(self):
+        worker = worker_cache('small-worker', L1_MAX_ENTRIES=2)
+        for key in ('a', 'b', 'c'):
+            worker.set(key, key)
+        caches['shared'].clear()
+        self.assertEqual(worker.get_many(['a', 'b', 'c']),
+                         {'b': 'b', 'c': 'c'})
+
+    def test_version_bump_is_seen_by_other_workers(self):
+        before = versions.get_version('posts')
+        self.assertEqual(self.other.get('feed_version:posts'), int(before))
+        self.other.incr('feed_version:posts')
+        self.assertEqual(versions.get_version('posts'), str(int(before) + 1))
+
+    def test_recent_posts_invalidation_is_seen_by_other_workers(self):
+        key = feeds.AUTHOR_RECENT_POSTS_KEY.format(1)
+        self.other.set(key, ['старый список'])
+        self.assertEqual(self.other.get(key), ['старый список'])
+        feeds.invalidate_recent_posts(1)
+        self.assertIsNone(self.other.get(key))
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..counters import audit, counters_for
+from ..models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(counters_for(self.author).posts_count, 1)
+        self.assertEqual(counters_for(self.author).followers_count, 1)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.reader).following_count, 1)
+        follow.delete()
+        post.delete()
+        counters = UserCounters.objects.get(user=self.author)
+        self.assertEqual(
+            (counters.posts_count, counters.followers_count), (0, 0))
+
+    def test_edit_keeps_comments_count(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        # Комментарий пришёл, пока правка держала прочитанный пост.
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        stale.text = 'Исправленный пост'
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный пост')
+        self.assertEqual(post.comments_count, 1)
+
+    def test_missing_counters_are_zero(self):
+        self.assertEqual(counters_for(self.reader).posts_count, 0)
+
+    def test_audit_repairs_drift(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        UserCounters.objects.filter(user=self.author).update(posts_count=7)
+        Post.objects.filter(pk=post.pk).update(comments_count=3)
+        out = StringIO()
+        call_command('audit_counters', '--fix', stdout=out)
+        self.assertIn('Расхождений исправлено: 2', out.getvalue())
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 1)
+        self.assertEqual(audit(), [])
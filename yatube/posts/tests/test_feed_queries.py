@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feeds
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryCountTests(TestCase):
+    """Число запросов страниц лент не зависит от числа постов на них."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author_0'}),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_posts(self, count):
+        for _ in range(count):
+            author, _ = User.objects.get_or_create(
+                username=f'author_{Post.objects.count() % 3}')
+            Follow.objects.get_or_create(user=self.reader, author=author)
+            Post.objects.create(
+                author=author, group=self.group,
+                text=f'Пост {Post.objects.count()}',
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_feeds_use_constant_number_of_queries(self):
+        for engine in feeds.FEED_ENGINES:
+            with self.subTest(engine=engine), \
+                    override_settings(FOLLOW_FEED_ENGINE=engine):
+                Post.objects.all().delete()
+                self.add_posts(3)
+                small = [self.count_queries(url) for url in self.urls]
+                self.add_posts(7)
+                self.assertEqual(
+                    [self.count_queries(url) for url in self.urls], small)
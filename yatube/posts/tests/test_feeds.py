@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from ..feeds import FEED_ENGINES, follow_feed
+from ..models import Follow, Post
+from ..paginator import decode_cursor
+
+User = get_user_model()
+
+
+class FollowFeedEngineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        authors = [
+            User.objects.create_user(username=f'author_{i}')
+            for i in range(3)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        for i in range(25):
+            Post.objects.create(author=authors[i % 3], text=f'Пост {i}')
+        cls.expected = list(
+            Post.objects.filter(author__in=authors)
+            .order_by('-pub_date', '-pk')
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def get_feed(self, engine, **params):
+        request = self.factory.get('/follow/', params)
+        request.user = self.reader
+        return follow_feed(request, engine)
+
+    def test_engines_return_same_pages(self):
+        for engine in FEED_ENGINES:
+            with self.subTest(engine=engine):
+                page = self.get_feed(engine)
+                seen = list(page)
+                while page.has_next():
+                    page = self.get_feed(
+                        engine, after=page.next_cursor())
+                    seen.extend(page)
+                self.assertEqual(seen, self.expected)
+                third = self.get_feed(engine, page=3)
+                self.assertEqual(list(third), self.expected[20:])
+
+    def test_merge_engine_previous_page(self):
+        second = self.get_feed('merge', page=2)
+        page = self.get_feed('merge', before=second.previous_cursor())
+        self.assertEqual(list(page), self.expected[:10])
+        self.assertIsNotNone(decode_cursor(second.previous_cursor()))
+
+    def test_merge_engine_sees_new_post(self):
+        self.get_feed('merge')
+        post = Post.objects.create(
+            author=self.expected[0].author, text='Свежий пост')
+        self.assertEqual(self.get_feed('merge')[0], post)
@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..forms import PostForm
@@ -9,6 +9,7 @@ from ..models import Comment, Group, Post
 User = get_user_model()
 
 
+@override_settings(POST_THUMBNAIL_WORKERS=0)
 class PostCreateFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -90,6 +91,18 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count)
         self.assertEqual(response.status_code, 200)
 
+    def test_duplicate_text_is_rejected(self):
+        posts_count = Post.objects.count()
+        response = self.auth_client.post(
+            reverse('posts:post_create'), data={'text': self.post.text})
+        self.assertFormError(
+            response, 'form', 'text', 'Пост с таким текстом уже существует.')
+        self.assertEqual(Post.objects.count(), posts_count)
+
+    def test_edit_keeps_own_text(self):
+        form = PostForm(data={'text': self.post.text}, instance=self.post)
+        self.assertTrue(form.is_valid())
+
     def test_add_comment(self):
         comments_count = Comment.objects.count()
         all_comments = set(Comment.objects.all())
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics
+from ..models import Post
+
+User = get_user_model()
+METRICS_DB = os.path.join(tempfile.mkdtemp(), 'metrics.sqlite3')
+
+
+@override_settings(METRICS_DB=METRICS_DB, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def scrape(self):
+        response = Client().get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_and_histogram(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('about:author'))
+        text = self.scrape()
+        self.assertIn(
+            'yatube_requests_total{route="posts:index",method="GET",'
+            'status="200"} 1', text)
+        self.assertIn('route="about:author"', text)
+        self.assertIn(
+            'yatube_request_duration_ms_bucket{route="posts:index",'
+            'le="+Inf"} 1', text)
+        self.assertIn(
+            'yatube_request_duration_ms_count{route="posts:index"} 1', text)
+        self.assertRegex(
+            text, r'yatube_db_queries_total\{route="posts:index"\} [1-9]')
+
+    def test_fragment_cache_ratio(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn(
+            'yatube_cache_lookups_total{cache="fragment",result="hit"} 1',
+            text)
+        self.assertIn(
+            'yatube_cache_lookups_total{cache="fragment",result="miss"} 1',
+            text)
+        self.assertIn('yatube_cache_hit_ratio{cache="fragment"} 0.5', text)
+
+    def test_totals_include_other_processes(self):
+        self.client.get(reverse('posts:index'))
+        metrics.flush()
+        # Так же в общий файл пишет любой другой рабочий процесс.
+        connection = sqlite3.connect(METRICS_DB)
+        with connection:
+            connection.execute(metrics.UPSERT, (
+                'requests_total',
+                'route="posts:index",method="GET",status="200"', 4))
+        connection.close()
+        self.assertIn(
+            'yatube_requests_total{route="posts:index",method="GET",'
+            'status="200"} 5', self.scrape())
+
+    def test_hidden_from_outside(self):
+        response = Client().get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    def test_local_address_is_not_enough(self):
+        # За обратным прокси все запросы приходят с 127.0.0.1.
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = Client().get(
+                    reverse('metrics'), REMOTE_ADDR='127.0.0.1', **headers)
+                self.assertEqual(response.status_code, 404)
+
+    def test_visible_to_staff(self):
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        self.assertEqual(client.get(reverse('metrics')).status_code, 200)
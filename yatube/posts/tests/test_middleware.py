@@ -0,0 +1,125 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import versions, views
+from ..middleware import page_cache_stats
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Первый пост', group=cls.group)
+        cls.other_post = Post.objects.create(
+            author=cls.author, text='Второй пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def detail(self, post):
+        return reverse('posts:post_detail', kwargs={'post_id': post.pk})
+
+    def test_repeated_anonymous_get_is_served_from_cache(self):
+        first = self.guest_client.get(self.detail(self.post))
+        second = self.guest_client.get(self.detail(self.post))
+        self.assertIsNotNone(first.context)
+        self.assertIsNone(second.context)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(
+            page_cache_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_comment_purges_only_its_post(self):
+        self.guest_client.get(self.detail(self.post))
+        self.guest_client.get(self.detail(self.other_post))
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Новый комментарий')
+        response = self.guest_client.get(self.detail(self.post))
+        self.assertContains(response, 'Новый комментарий')
+        self.assertIsNone(
+            self.guest_client.get(self.detail(self.other_post)).context)
+
+    def test_group_and_follow_changes_purge_pages(self):
+        group_url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': self.author})
+        self.guest_client.get(group_url)
+        self.guest_client.get(profile_url)
+        self.group.title = 'Новое имя'
+        self.group.save()
+        Follow.objects.create(
+            user=User.objects.create_user(username='reader'),
+            author=self.author,
+        )
+        self.assertContains(self.guest_client.get(group_url), 'Новое имя')
+        self.assertEqual(
+            self.guest_client.get(profile_url).context['counters']
+            .followers_count, 1)
+
+    def test_signup_keeps_feeds_cached(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            self.detail(self.post),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        User.objects.create_user(username='newcomer')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIsNone(self.guest_client.get(url).context)
+
+    def test_author_rename_purges_pages_with_author(self):
+        commenter = User.objects.create_user(username='commenter')
+        Comment.objects.create(
+            post=self.other_post, author=commenter, text='Комментарий')
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            self.detail(self.post),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        detail = self.detail(self.other_post)
+        self.guest_client.get(detail)
+        self.author.first_name = 'Лев'
+        self.author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Лев')
+        commenter.first_name = 'Комментатор'
+        commenter.save()
+        self.assertIsNotNone(self.guest_client.get(detail).context)
+        self.assertIsNone(
+            self.guest_client.get(self.detail(self.post)).context)
+
+    def test_authorized_requests_are_not_cached(self):
+        client = Client()
+        client.force_login(self.author)
+        client.get(self.detail(self.post))
+        self.assertIsNotNone(client.get(self.detail(self.post)).context)
+
+    def test_change_during_render_is_not_cached_as_fresh(self):
+        paginate = views.paginate
+
+        def paginate_then_bump(*args, **kwargs):
+            page_obj = paginate(*args, **kwargs)
+            list(page_obj)
+            # Правка после чтения данных, но до сохранения страницы.
+            versions.bump('posts')
+            return page_obj
+
+        with mock.patch.object(views, 'paginate', paginate_then_bump):
+            self.guest_client.get(reverse('posts:index'))
+        self.assertIsNotNone(
+            self.guest_client.get(reverse('posts:index')).context)
@@ -0,0 +1,64 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+BEFORE = [('posts', '0008_post_updated')]
+AFTER = [('posts', '0009_auto_20261018_0405')]
+
+
+class RemoveDuplicateFollowsTests(TransactionTestCase):
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_counters_ignore_removed_duplicates(self):
+        apps = self.migrate(BEFORE)
+        User = apps.get_model('auth', 'User')
+        Follow = apps.get_model('posts', 'Follow')
+        UserCounters = apps.get_model('posts', 'UserCounters')
+        reader = User.objects.create(username='reader')
+        author = User.objects.create(username='author')
+        for user in (reader, author):
+            UserCounters.objects.create(user=user)
+        for _ in range(3):
+            Follow.objects.create(user=reader, author=author)
+        UserCounters.objects.filter(user=author).update(followers_count=3)
+        UserCounters.objects.filter(user=reader).update(following_count=3)
+
+        apps = self.migrate(AFTER)
+        UserCounters = apps.get_model('posts', 'UserCounters')
+        self.assertEqual(apps.get_model('posts', 'Follow').objects.count(), 1)
+        self.assertEqual(
+            UserCounters.objects.get(user_id=author.pk).followers_count, 1)
+        self.assertEqual(
+            UserCounters.objects.get(user_id=reader.pk).following_count, 1)
+
+    def test_counters_are_recounted(self):
+        apps = self.migrate(BEFORE)
+        User = apps.get_model('auth', 'User')
+        Post = apps.get_model('posts', 'Post')
+        Comment = apps.get_model('posts', 'Comment')
+        author = User.objects.create(username='author')
+        reader = User.objects.create(username='reader')
+        post = Post.objects.create(author=author, text='Пост')
+        Post.objects.create(author=author, text='Другой')
+        for user in (author, reader):
+            Comment.objects.create(post=post, author=user, text='Ок')
+        Post.objects.update(comments_count=5)
+
+        apps = self.migrate(AFTER)
+        Post = apps.get_model('posts', 'Post')
+        UserCounters = apps.get_model('posts', 'UserCounters')
+        self.assertEqual(
+            dict(Post.objects.values_list('text', 'comments_count')),
+            {'Пост': 2, 'Другой': 0})
+        self.assertEqual(
+            UserCounters.objects.get(user_id=author.pk).posts_count, 2)
+        self.assertEqual(
+            UserCounters.objects.get(user_id=reader.pk).posts_count, 0)
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import Client, TestCase
+from django.urls import reverse
 
 from ..models import Group, Post
 
@@ -37,3 +38,18 @@ class PostModelTest(TestCase):
         task = PostModelTest.group
         help_text = task._meta.get_field('title').help_text
         self.assertEqual(help_text, '')
+
+    def test_duplicate_text_is_rejected_in_admin(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.post(reverse('admin:posts_post_add'), {
+            'text': self.post.text,
+            'author': self.user.pk,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response, 'adminform', 'text',
+            'Пост с таким текстом уже существует.')
+        self.assertEqual(Post.objects.count(), 1)
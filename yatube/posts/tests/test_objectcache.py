@@ -0,0 +1,121 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase
+
+from .. import objectcache, versions
+from ..models import Comment, Follow, Group, Post
+from ..objectcache import get_object_or_404
+
+User = get_user_model()
+
+
+class ObjectCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeated_lookup_is_cached(self):
+        lookups = (
+            (Post, {'pk': self.post.pk}),
+            (Post.objects.select_related('author__counters', 'group'),
+             {'pk': self.post.pk}),
+            (Group, {'slug': 'group'}),
+            (User.objects.select_related('counters'),
+             {'username': 'author'}),
+        )
+        for klass, kwargs in lookups:
+            with self.subTest(klass=klass):
+                # Первый промах узнаёт области объекта, второй кладёт
+                # его под версией, прочитанной до запроса.
+                get_object_or_404(klass, **kwargs)
+                first = get_object_or_404(klass, **kwargs)
+                with self.assertNumQueries(0):
+                    self.assertEqual(get_object_or_404(klass, **kwargs), first)
+
+    def test_change_during_fetch_is_not_cached_as_fresh(self):
+        get_object_or_404(Post, pk=self.post.pk)
+        fetch = objectcache.get_from_db_or_404
+
+        def fetch_then_edit(*args, **kwargs):
+            post = fetch(*args, **kwargs)
+            Post.objects.filter(pk=post.pk).update(text='Новый текст')
+            versions.bump(f'post:{post.pk}')
+            return post
+
+        with mock.patch.object(
+                objectcache, 'get_from_db_or_404', fetch_then_edit):
+            get_object_or_404(Post, pk=self.post.pk)
+        self.assertEqual(
+            get_object_or_404(Post, pk=self.post.pk).text, 'Новый текст')
+
+    def test_private_user_fields_are_not_cached(self):
+        lookups = (
+            (User.objects.select_related('counters'),
+             {'username': 'author'}, lambda user: user),
+            (Post.objects.select_related('author__counters', 'group'),
+             {'pk': self.post.pk}, lambda post: post.author),
+        )
+        for klass, kwargs, user_of in lookups:
+            with self.subTest(klass=klass):
+                get_object_or_404(klass, **kwargs)
+                get_object_or_404(klass, **kwargs)
+                with self.assertNumQueries(0):
+                    user = user_of(get_object_or_404(klass, **kwargs))
+                self.assertEqual(user.username, 'author')
+                self.assertLessEqual(
+                    {'password', 'email', 'last_login'},
+                    user.get_deferred_fields())
+                with self.assertNumQueries(1):
+                    self.assertEqual(user.password, self.author.password)
+
+    def test_select_related_variants_are_separate(self):
+        get_object_or_404(Post, pk=self.post.pk)
+        post = get_object_or_404(
+            Post.objects.select_related('author'), pk=self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(post.author, self.author)
+
+    def test_comment_invalidates_post(self):
+        get_object_or_404(Post, pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.reader, text='!')
+        self.assertEqual(
+            get_object_or_404(Post, pk=self.post.pk).comments_count, 1)
+
+    def test_follow_invalidates_author_counters(self):
+        queryset = User.objects.select_related('counters')
+        get_object_or_404(queryset, username='author')
+        Follow.objects.create(user=self.reader, author=self.author)
+        author = get_object_or_404(queryset, username='author')
+        self.assertEqual(author.counters.followers_count, 1)
+
+    def test_group_change_invalidates_group_and_posts(self):
+        get_object_or_404(Group, slug='group')
+        get_object_or_404(
+            Post.objects.select_related('group'), pk=self.post.pk)
+        Group.objects.filter(pk=self.group.pk).update(title='Новая')
+        self.group.refresh_from_db()
+        self.group.save()
+        self.assertEqual(get_object_or_404(Group, slug='group').title, 'Новая')
+        post = get_object_or_404(
+            Post.objects.select_related('group'), pk=self.post.pk)
+        self.assertEqual(post.group.title, 'Новая')
+
+    def test_filtered_and_missing_lookups_hit_database(self):
+        queryset = Post.objects.filter(author=self.author)
+        get_object_or_404(queryset, pk=self.post.pk)
+        with self.assertNumQueries(1):
+            get_object_or_404(queryset, pk=self.post.pk)
+        for _ in range(2):
+            with self.assertNumQueries(1), self.assertRaises(Http404):
+                get_object_or_404(Group, slug='missing')
@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..paginator import KeysetPaginator, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Group.objects.create(title='Группа', slug='g')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}') for i in range(25)
+        )
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_cursor_roundtrip(self):
+        post = self.ordered[0]
+        self.assertEqual(
+            decode_cursor(encode_cursor(post)), (post.pub_date, post.pk))
+        self.assertIsNone(decode_cursor('broken'))
+
+    def test_cursor_pages_walk_whole_feed(self):
+        paginator = KeysetPaginator(Post.objects.all())
+        page = paginator.get_cursor_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_cursor_page(
+                after=decode_cursor(page.next_cursor()))
+            seen.extend(page)
+        self.assertEqual(seen, self.ordered)
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator = KeysetPaginator(Post.objects.all())
+        second = paginator.get_page(2)
+        page = paginator.get_cursor_page(
+            before=decode_cursor(second.previous_cursor()))
+        self.assertEqual(list(page), self.ordered[:10])
+        self.assertFalse(page.has_previous())
+
+    def test_cursor_page_does_not_count(self):
+        paginator = KeysetPaginator(Post.objects.all())
+        after = (self.ordered[9].pub_date, self.ordered[9].pk)
+        with self.assertNumQueries(1):
+            page = paginator.get_cursor_page(after=after)
+            self.assertEqual(list(page), self.ordered[10:20])
+            self.assertTrue(page.has_next())
+
+    def test_first_page_does_not_count(self):
+        paginator = KeysetPaginator(Post.objects.all())
+        with self.assertNumQueries(0):
+            page = paginator.paginate(RequestFactory().get('/'))
+        self.assertIs(type(page), Page)
+        with self.assertNumQueries(1):
+            self.assertEqual(list(page), self.ordered[:10])
+            self.assertTrue(page.has_next())
+            self.assertFalse(page.has_previous())
+            self.assertEqual(
+                decode_cursor(page.next_cursor()),
+                (self.ordered[9].pub_date, self.ordered[9].pk))
+
+    def test_warm_fragment_skips_feed_queries(self):
+        # Страница целиком кэшируется только для гостей, поэтому здесь
+        # работает лишь кэш фрагмента ленты.
+        client = Client()
+        client.force_login(self.user)
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_list', kwargs={'slug': 'g'})):
+            with self.subTest(url=url):
+                client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(url)
+                feed = [
+                    query['sql'] for query in queries.captured_queries
+                    if query['sql'].startswith('SELECT "posts_post"')
+                    or 'COUNT(*)' in query['sql']
+                ]
+                self.assertEqual(feed, [])
+
+    def test_elided_page_range(self):
+        paginator = KeysetPaginator(Post.objects.all(), per_page=1)
+        ellipsis = paginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(12)),
+            [1, ellipsis, 10, 11, 12, 13, 14, ellipsis, 25],
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, ellipsis, 25],
+        )
+        paginator = KeysetPaginator(Post.objects.all())
+        self.assertEqual(list(paginator.get_elided_page_range(2)), [1, 2, 3])
+
+    def test_paginator_markup_is_windowed(self):
+        page = KeysetPaginator(Post.objects.all(), per_page=1).get_page(12)
+        html = render_to_string('includes/paginator.html', {'page_obj': page})
+        # Первая, Предыдущая, 9 элементов окна, Следующая, Последняя.
+        self.assertEqual(html.count('<li'), 13)
+
+    def test_page_number_urls_still_work(self):
+        response = self.guest_client.get(
+            reverse('posts:index'), {'page': 3})
+        self.assertEqual(
+            list(response.context['page_obj']), self.ordered[20:])
+
+    def test_after_cursor_url(self):
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': self.user}),
+            {'after': encode_cursor(self.ordered[19])},
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), self.ordered[20:])
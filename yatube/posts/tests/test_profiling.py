@@ -0,0 +1,76 @@
+import glob
+import os
+import pstats
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.shortcuts import render
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import profiling
+from ..models import Post
+
+User = get_user_model()
+PROFILER_DIR = tempfile.mkdtemp()
+
+
+def busy_loop(seconds):
+    finish = time.perf_counter() + seconds
+    while time.perf_counter() < finish:
+        pass
+
+
+def slow_render(*args, **kwargs):
+    busy_loop(0.05)
+    return render(*args, **kwargs)
+
+
+@override_settings(PROFILER_DIR=PROFILER_DIR, PROFILER_INTERVAL=0.001,
+                   PROFILER_SLOW_MS=30, PROFILER_SAMPLE_RATE=0)
+class SlowRequestProfilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(shutil.rmtree, PROFILER_DIR, ignore_errors=True)
+
+    def dumps(self):
+        return glob.glob(os.path.join(PROFILER_DIR, '*.prof'))
+
+    def test_sampler_writes_pstats(self):
+        profile = profiling.start()
+        busy_loop(0.05)
+        path = profiling.finish(profile, 'posts:index')
+        self.assertRegex(os.path.basename(path), r'^posts\.index-\d+ms-')
+        stats = pstats.Stats(path).stats
+        self.assertIn('busy_loop', {name for _, _, name in stats})
+
+    def test_fast_requests_are_not_dumped(self):
+        self.client = Client()
+        self.client.get(reverse('about:author'))
+        self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertEqual(self.dumps(), [])
+
+    def test_slow_view_is_dumped_and_reported(self):
+        with mock.patch('posts.views.render', slow_render):
+            Client().get(
+                reverse('posts:post_detail',
+                        kwargs={'post_id': self.post.pk}))
+        [path] = self.dumps()
+        self.assertIn('posts.post_detail-', path)
+        out = StringIO()
+        call_command('profile_report', route='posts:post_detail', stdout=out)
+        self.assertIn('Дампов: 1', out.getvalue())
+        self.assertIn('busy_loop', out.getvalue())
+        self.assertIn('project', out.getvalue())
@@ -0,0 +1,112 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from about import urls as about_urls
+from users import urls as users_urls
+
+from .. import urls as posts_urls
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+# QUERY_BUDGETS_UPDATE=1 перезаписывает файл бюджетов замеренными числами.
+UPDATE_BUDGETS = os.environ.get('QUERY_BUDGETS_UPDATE') == '1'
+ROLES = ('anonymous', 'author', 'follower')
+SCALES = (
+    {'posts': 2, 'comments': 1, 'followers': 1},
+    {'posts': 25, 'comments': 5, 'followers': 5},
+)
+
+
+class QueryBudgetTests(TestCase):
+    """Бюджет запросов для каждого именованного маршрута.
+
+    Число запросов не должно зависеть от объёма данных и не должно
+    превышать значение из query_budgets.json.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def seed(self, posts, comments, followers):
+        for _ in range(posts - self.author.posts.count()):
+            post = Post.objects.create(
+                author=self.author, group=self.group,
+                text=f'Пост {Post.objects.count()}',
+            )
+            for i in range(comments):
+                Comment.objects.create(
+                    post=post, author=self.follower, text=f'Ответ {i}')
+        for i in range(followers - self.author.following.count()):
+            reader = User.objects.create_user(username=f'reader_{i}')
+            Follow.objects.create(user=reader, author=self.author)
+
+    def routes(self):
+        post = self.author.posts.first()
+        kwargs = {
+            'post_id': post.pk,
+            'slug': self.group.slug,
+            'username': self.author.username,
+        }
+        for module in (posts_urls, users_urls, about_urls):
+            for pattern in module.urlpatterns:
+                names = pattern.pattern.converters.keys()
+                yield f'{module.app_name}:{pattern.name}', {
+                    name: kwargs[name] for name in names}
+
+    def client_for(self, role):
+        client = Client()
+        if role != 'anonymous':
+            client.force_login(getattr(self, role))
+        return client
+
+    def count_queries(self, role, route, kwargs):
+        client = self.client_for(role)
+        cache.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(reverse(route, kwargs=kwargs))
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, route)
+        return len(queries)
+
+    def measure(self):
+        return {
+            f'{route} {role}': self.count_queries(role, route, kwargs)
+            for route, kwargs in self.routes()
+            for role in ROLES
+        }
+
+    def test_query_budgets(self):
+        measured = []
+        for scale in SCALES:
+            self.seed(**scale)
+            measured.append(self.measure())
+        small, large = measured
+        if UPDATE_BUDGETS:
+            with open(BUDGETS_PATH, 'w') as budgets_file:
+                json.dump(large, budgets_file, indent=2, sort_keys=True)
+                budgets_file.write('\n')
+        with open(BUDGETS_PATH) as budgets_file:
+            budgets = json.load(budgets_file)
+        for key, count in large.items():
+            with self.subTest(view=key):
+                self.assertEqual(
+                    small[key], count,
+                    'Число запросов растёт вместе с объёмом данных',
+                )
+                self.assertIn(key, budgets, 'Нет бюджета для маршрута')
+                self.assertLessEqual(count, budgets[key])
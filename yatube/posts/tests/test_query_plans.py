@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..paginator import encode_cursor
+
+User = get_user_model()
+
+# Поле выбора группы в PostForm перечисляет все группы целиком.
+EXPECTED_SCANS = {'SCAN posts_group'}
+
+
+def bad_plan_steps(sql):
+    """Шаги плана SQLite с полным сканированием таблицы или сортировкой."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        steps = [
+            row[-1].replace('SCAN TABLE', 'SCAN')
+            for row in cursor.fetchall()
+        ]
+    return [
+        step for step in steps
+        if 'TEMP B-TREE' in step
+        or (step.startswith('SCAN') and 'USING' not in step
+            and step not in EXPECTED_SCANS)
+    ]
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN QUERY PLAN для всех запросов страниц posts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for i in range(30):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {i}',
+                group=cls.group if i % 2 else None,
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(post=cls.post, author=cls.reader, text='!')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cursor = {'after': encode_cursor(Post.objects.all()[9])}
+        cls.urls = (
+            (reverse('posts:index'), {}),
+            (reverse('posts:index'), {'page': 2}),
+            (reverse('posts:index'), cursor),
+            (reverse('posts:group_list', kwargs={'slug': 'group'}), {}),
+            (reverse('posts:group_list', kwargs={'slug': 'group'}), cursor),
+            (reverse('posts:profile', kwargs={'username': 'author'}), {}),
+            (reverse('posts:profile', kwargs={'username': 'author'}),
+             cursor),
+            (reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+             {}),
+            (reverse('posts:post_edit', kwargs={'post_id': cls.post.pk}),
+             {}),
+            (reverse('posts:follow_index'), {}),
+            (reverse('posts:follow_index'), cursor),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def check_views(self, client):
+        for url, params in self.urls:
+            with self.subTest(url=url, params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(url, params)
+                for query in queries:
+                    sql = query['sql']
+                    if not sql.startswith('SELECT'):
+                        continue
+                    self.assertEqual(bad_plan_steps(sql), [], sql)
+
+    def test_anonymous_views(self):
+        self.check_views(Client())
+
+    def test_authorized_views(self):
+        for user in (self.author, self.reader):
+            client = Client()
+            client.force_login(user)
+            self.check_views(client)
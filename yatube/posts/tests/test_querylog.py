@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..management.commands import slow_query_report
+from ..models import Post
+from ..querylog import normalize
+
+User = get_user_model()
+SLOW_QUERY_LOG = os.path.join(tempfile.mkdtemp(), 'slow.jsonl')
+
+
+@override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_LOG=SLOW_QUERY_LOG)
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        open(SLOW_QUERY_LOG, 'w').close()
+
+    def entries(self):
+        with open(SLOW_QUERY_LOG) as log_file:
+            return [json.loads(line) for line in log_file]
+
+    def test_normalize(self):
+        self.assertEqual(
+            normalize(
+                'SELECT * FROM "posts_post"\n WHERE "id" IN (%s, %s, %s) '
+                "AND text = 'it''s' AND author_id = 15"),
+            'SELECT * FROM "posts_post" WHERE "id" IN (...) '
+            'AND text = ? AND author_id = ?',
+        )
+
+    def test_slow_queries_are_logged_with_plan_and_call_site(self):
+        with self.assertLogs('posts.slow_queries', 'WARNING'):
+            Client().get(
+                reverse('posts:profile', kwargs={'username': 'author'}))
+        entries = self.entries()
+        self.assertTrue(entries)
+        selects = [e for e in entries if e['sql'].startswith('SELECT')]
+        self.assertTrue(all(e['plan'] for e in selects))
+        self.assertIn(
+            os.path.join('posts', 'views.py'),
+            ' '.join(e['view'] or '' for e in entries))
+        self.assertFalse(
+            any(e['sql'].startswith('EXPLAIN') for e in entries))
+
+    def test_report_ranks_by_total_time(self):
+        with self.assertLogs('posts.slow_queries', 'WARNING'):
+            Client().get(reverse('posts:index'))
+            Client().get(reverse('posts:index'), {'page': 1})
+        logged = len(self.entries())
+        out = StringIO()
+        call_command('slow_query_report', limit=3, truncate=True, stdout=out)
+        report = out.getvalue()
+        self.assertIn(f'Медленных запросов: {logged}', report)
+        self.assertIn('plan: ', report)
+        self.assertIn('ms всего', report)
+        self.assertFalse(os.path.exists(SLOW_QUERY_LOG))
+
+    def test_truncate_keeps_entries_written_during_report(self):
+        with open(SLOW_QUERY_LOG, 'a') as log_file:
+            log_file.write(json.dumps({
+                'time': 0, 'ms': 1, 'sql': 'SELECT 1', 'site': 'old',
+                'view': None, 'plan': None}) + '\n')
+        rollup = slow_query_report.Command.rollup
+
+        def rollup_during_write(command, entries):
+            with open(SLOW_QUERY_LOG, 'a') as log_file:
+                log_file.write(json.dumps({
+                    'time': 0, 'ms': 1, 'sql': 'SELECT 2', 'site': 'new',
+                    'view': None, 'plan': None}) + '\n')
+            return rollup(command, entries)
+
+        with mock.patch.object(
+                slow_query_report.Command, 'rollup', rollup_during_write):
+            call_command('slow_query_report', truncate=True, stdout=StringIO())
+        self.assertEqual([e['site'] for e in self.entries()], ['new'])
+        self.assertEqual(
+            os.listdir(os.path.dirname(SLOW_QUERY_LOG)), ['slow.jsonl'])
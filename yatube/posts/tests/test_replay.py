@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class ReplayRequestsTests(TransactionTestCase):
+    """Запросы выполняются в потоках, поэтому данные должны быть закоммичены.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='leo')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        records = [
+            {'method': 'GET', 'path': '/'},
+            {'path': '/?page=2'},
+            {'path': f'/posts/{self.post.pk}/', 'user': 'leo'},
+            {'method': 'POST', 'path': '/create/', 'user': 'leo',
+             'body': {'text': 'Новый пост'}},
+            {'request_id': 'no-path'},
+        ]
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        self.path = os.path.join(directory, 'requests.jsonl')
+        self.addCleanup(os.remove, self.path)
+        with open(self.path, 'w') as records_file:
+            for record in records:
+                records_file.write(json.dumps(record) + '\n')
+            records_file.write('not json\n')
+
+    def test_replay_reports_routes(self):
+        out, err = StringIO(), StringIO()
+        call_command('replay_requests', self.path, workers=2,
+                     stdout=out, stderr=err)
+        report = out.getvalue()
+        self.assertIn('GET posts:index', report)
+        self.assertIn('GET posts:post_detail', report)
+        self.assertIn('POST posts:post_create', report)
+        self.assertIn('Всего 4 запросов', report)
+        self.assertIn('Пропущено строк без запроса: 2', err.getvalue())
+
+    def test_replay_posts_as_user(self):
+        call_command('replay_requests', self.path, workers=1,
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(
+            Post.objects.filter(author=self.user, text='Новый пост').exists())
+        self.assertFalse(Session.objects.exists())
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import (Client, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from .. import routers
+from ..middleware import PIN_COOKIE
+from ..models import Post
+
+User = get_user_model()
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        routers.start_request(pinned=False)
+        self.addCleanup(routers.finish_request)
+
+    def test_posts_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_reads_after_write_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertTrue(routers.finish_request())
+
+    def test_pinned_request_reads_primary(self):
+        routers.start_request(pinned=True)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_no_migrations_on_replicas(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReadYourWritesTests(TransactionTestCase):
+    """Реплика — отдельный файл, данные основной базы коммитятся."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        connections.databases['replica'] = {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': os.path.join(directory, 'replica.sqlite3'),
+        }
+        self.addCleanup(connections.databases.pop, 'replica')
+        self.addCleanup(connections.__delitem__, 'replica')
+        self.addCleanup(lambda: connections['replica'].close())
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        routers.sync_replicas()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def profile_posts(self, client):
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_author_sees_own_post_before_sync(self):
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.profile_posts(self.client), ['Новый пост'])
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='reader'))
+        self.assertEqual(self.profile_posts(reader), [])
+        routers.sync_replicas()
+        self.assertEqual(self.profile_posts(reader), ['Новый пост'])
+
+    def test_replica_reads_do_not_poison_page_cache(self):
+        profile = reverse('posts:profile', kwargs={'username': 'author'})
+        self.client.post(reverse('posts:post_create'), {'text': 'Новый пост'})
+        reader = Client()
+        reader.get(profile)
+        routers.sync_replicas()
+        self.assertContains(reader.get(profile), 'Новый пост')
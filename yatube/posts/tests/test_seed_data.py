@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import counters
+from ..management.commands import bench_views
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+class SeedDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_data', users=20, groups=3, posts=200, comments=100,
+            follows=3, batch_size=50, stdout=StringIO(),
+        )
+
+    def test_seeded_counts(self):
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+
+    def test_activity_is_skewed(self):
+        posts = sorted(
+            (author.posts.count() for author in User.objects.all()),
+            reverse=True,
+        )
+        self.assertGreater(posts[0], 5 * posts[len(posts) // 2])
+
+    def test_signal_state_is_rebuilt(self):
+        self.assertEqual(counters.audit(), [])
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertFalse(Post.objects.filter(text_hash='').exists())
+
+    def test_explicit_dates_are_kept(self):
+        dates = list(Post.objects.values_list('pub_date', flat=True))
+        self.assertGreater(max(dates) - min(dates), timedelta(days=30))
+
+    def test_ids_follow_deleted_rows(self):
+        # AUTOINCREMENT не выдаёт id удалённых строк повторно.
+        User.objects.create(username='deleted').delete()
+        Post.objects.latest('pk').delete()
+        call_command(
+            'seed_data', users=5, groups=1, posts=20, comments=20,
+            follows=2, batch_size=50, stdout=StringIO(),
+        )
+        self.assertEqual(Comment.objects.count(), 120)
+        self.assertEqual(counters.audit(), [])
+
+    def test_bench_views_reports_every_route(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.json')
+            call_command(
+                'bench_views', requests=2, json_path=path, stdout=StringIO())
+            with open(path) as results_file:
+                results = json.load(results_file)
+        self.assertIn('posts:index anonymous', results)
+        self.assertIn('posts:follow_index reader', results)
+        self.assertEqual(results['posts:index anonymous']['statuses'], [200])
+
+    def test_bench_logout_keeps_reader_logged_in(self):
+        command = bench_views.Command()
+        client = command.client_for('reader')
+        command.request(client, reverse('users:logout'), cold=False)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+
+from django.db import OperationalError, connections, transaction
+from django.test import SimpleTestCase
+
+
+class TunedSQLiteBackendTests(SimpleTestCase):
+    """Бэкенд core.backends.sqlite3 на отдельном файле базы."""
+
+    def connect(self, alias, pragmas=None):
+        connections.databases[alias] = {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': self.path,
+            'OPTIONS': {'pragmas': pragmas or {}},
+        }
+        self.addCleanup(connections.databases.pop, alias)
+        connection = connections[alias]
+        self.addCleanup(connection.close)
+        return connection
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'db.sqlite3')
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        connection = self.connect('tuned', {'cache_size': -2000})
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(connection, 'cache_size'), -2000)
+
+    def test_transactions_take_write_lock_immediately(self):
+        first = self.connect('first')
+        second = self.connect('second', {'busy_timeout': 0})
+        with first.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (x INTEGER)')
+        with transaction.atomic(using='first'):
+            # Только чтение, но блокировка на запись уже взята.
+            with first.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM t')
+            with self.assertRaisesMessage(OperationalError, 'locked'):
+                with second.cursor() as cursor:
+                    cursor.execute('INSERT INTO t VALUES (1)')
+
+    def test_connection_is_reused(self):
+        connection = self.connect('reused')
+        connections.databases['reused']['CONN_MAX_AGE'] = 60
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close_if_unusable_or_obsolete()
+        self.assertIs(connection.connection, raw)
@@ -0,0 +1,124 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from .. import stampede
+from .test_cache_backend import worker_cache
+
+
+class StampedeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def compute(self, value='новое'):
+        def compute():
+            self.calls.append(value)
+            return value
+        return compute
+
+    def test_value_is_computed_once(self):
+        self.assertEqual(
+            stampede.get_or_set('key', self.compute(), 60), ('новое', True))
+        self.assertEqual(
+            stampede.get_or_set('key', self.compute(), 60), ('новое', False))
+        self.assertEqual(self.calls, ['новое'])
+
+    def test_stale_value_is_served_while_other_recomputes(self):
+        stampede.store('key', 'старое', 60, version=1)
+        self.assertTrue(stampede.acquire('key'))
+        self.assertEqual(
+            stampede.get_or_set('key', self.compute(), 60, version=2),
+            ('старое', False))
+        stampede.release('key')
+        self.assertEqual(
+            stampede.get_or_set('key', self.compute(), 60, version=2),
+            ('новое', True))
+        self.assertEqual(self.calls, ['новое'])
+
+    def test_fresh_value_from_other_worker_is_not_recomputed(self):
+        workers = [worker_cache(name) for name in ('worker-1', 'worker-2')]
+        for worker in workers:
+            worker.clear()
+        with mock.patch.object(stampede, 'cache', workers[0]):
+            stampede.store('key', 'старое', 60, version=1)
+        with mock.patch.object(stampede, 'cache', workers[1]):
+            stampede.get_or_set('key', self.compute(), 60, version=2)
+        with mock.patch.object(stampede, 'cache', workers[0]):
+            self.assertEqual(
+                stampede.get_or_set('key', self.compute(), 60, version=2),
+                ('новое', False))
+        self.assertEqual(self.calls, ['новое'])
+
+    @override_settings(STAMPEDE_WAIT=0.2, STAMPEDE_POLL=0.01)
+    def test_missing_value_waits_for_recompute(self):
+        stampede.acquire('key')
+
+        def recompute():
+            time.sleep(0.05)
+            stampede.store('key', 'чужое', 60)
+            stampede.release('key')
+
+        thread = threading.Thread(target=recompute)
+        thread.start()
+        value = stampede.get_or_set('key', self.compute(), 60)
+        thread.join()
+        self.assertEqual(value, ('чужое', False))
+        self.assertEqual(self.calls, [])
+
+    @override_settings(STAMPEDE_WAIT=0.05, STAMPEDE_POLL=0.01)
+    def test_stuck_lease_does_not_block_forever(self):
+        stampede.acquire('key')
+        self.assertEqual(
+            stampede.get_or_set('key', self.compute(), 60), ('новое', True))
+
+    def test_uncacheable_value_is_not_stored(self):
+        stampede.get_or_set(
+            'key', self.compute(), 60, cacheable=lambda value: False)
+        stampede.get_or_set('key', self.compute(), 60)
+        self.assertEqual(self.calls, ['новое', 'новое'])
+
+    def test_early_expiry_is_probabilistic(self):
+        entry = ('значение', None, 1.0, time.time() + 5)
+        with mock.patch('posts.stampede.random.random', return_value=0.0):
+            self.assertEqual(stampede.state(entry), stampede.FRESH)
+        with mock.patch('posts.stampede.random.random', return_value=0.999):
+            self.assertEqual(stampede.state(entry), stampede.STALE)
+        expired = ('значение', None, 0.0, time.time() - 1)
+        self.assertEqual(stampede.state(expired), stampede.STALE)
+
+    def test_concurrent_misses_compute_once(self):
+        results = []
+
+        def slow():
+            time.sleep(0.1)
+            return self.compute()()
+
+        def request():
+            results.append(stampede.get_or_set('key', slow, 60)[0])
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['новое'] * 8)
+        self.assertEqual(self.calls, ['новое'])
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load stampede %}'
+            '{% stampede_cache 60 fragment page version=version %}'
+            '{{ text }}{% endstampede_cache %}')
+
+        def render(**context):
+            return template.render(Context({'page': 1, **context}))
+
+        self.assertEqual(render(text='первый', version=1), 'первый')
+        self.assertEqual(render(text='второй', version=1), 'первый')
+        self.assertEqual(render(text='второй', version=2), 'второй')
+        self.assertEqual(render(text='третий', page=2, version=2), 'третий')
@@ -0,0 +1,185 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from .. import stampede, thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+GEOMETRY, OPTIONS = settings.POST_THUMBNAILS[0]
+# Результат render: байты миниатюры, её размер и размер оригинала.
+RENDERED = (b'thumbnail', (960, 339), (2, 1))
+
+
+class ThumbnailTests(TestCase):
+    """Сама нарезка (render) подменена: проверяется очередь вокруг неё."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.author, text='Пост', image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'))
+
+    @override_settings(POST_THUMBNAIL_WORKERS=0)
+    @mock.patch.object(thumbnails, 'render', return_value=RENDERED)
+    def test_post_create_pregenerates_thumbnails(self, render):
+        client = Client()
+        client.force_login(self.author)
+        client.post(reverse('posts:post_create'), {
+            'text': 'Пост',
+            'image': SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'),
+        })
+        render.assert_called_once()
+        post = Post.objects.get()
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            thumbnail = get_thumbnail(post.image, GEOMETRY, **OPTIONS)
+        schedule.assert_not_called()
+        self.assertNotIsInstance(thumbnail, thumbnails.Placeholder)
+        self.assertEqual(thumbnail.read(), b'thumbnail')
+        self.assertEqual(tuple(thumbnail.size), (960, 339))
+
+    @override_settings(POST_THUMBNAIL_WORKERS=1)
+    def test_placeholder_until_pool_finishes(self):
+        future = Future()
+        executor = mock.Mock(**{'submit.return_value': future})
+        post = self.create_post()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with mock.patch.object(thumbnails, 'pool', return_value=executor):
+            placeholder = get_thumbnail(post.image, GEOMETRY, **OPTIONS)
+            response = self.client.get(url)
+            self.client.get(url)
+        executor.submit.assert_called_once()
+        self.assertIsInstance(placeholder, thumbnails.Placeholder)
+        self.assertEqual(placeholder.size, (960, 339))
+        self.assertTrue(placeholder.url.startswith('data:image/svg+xml,'))
+        self.assertContains(response, placeholder.url)
+        future.set_result(RENDERED)
+        response = self.client.get(url)
+        self.assertNotContains(response, placeholder.url)
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+
+    @override_settings(POST_THUMBNAIL_WORKERS=1)
+    def test_placeholder_page_has_no_validators(self):
+        future = Future()
+        executor = mock.Mock(**{'submit.return_value': future})
+        post = self.create_post()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with mock.patch.object(thumbnails, 'pool', return_value=executor):
+            response = self.client.get(url)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        future.set_result(RENDERED)
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('ETag'))
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(POST_THUMBNAIL_WORKERS=0)
+    def test_failed_thumbnail_is_not_retried_at_once(self):
+        post = self.create_post()
+        with mock.patch.object(
+            thumbnails, 'render', side_effect=OSError('broken image')
+        ) as render, self.assertLogs('posts.thumbnails', 'ERROR'):
+            for _ in range(2):
+                self.assertIsInstance(
+                    get_thumbnail(post.image, GEOMETRY, **OPTIONS),
+                    thumbnails.Placeholder)
+        render.assert_called_once()
+
+    @override_settings(POST_THUMBNAIL_WORKERS=1)
+    def test_pregenerate_only_logs_errors(self):
+        post = self.create_post()
+        with mock.patch.object(
+            thumbnails, 'pool', side_effect=OSError('no processes')
+        ), self.assertLogs('posts.thumbnails', 'ERROR'):
+            thumbnails.pregenerate(post)
+
+    @override_settings(POST_THUMBNAIL_LEASE_TIMEOUT=600)
+    def test_queued_thumbnail_has_own_lease_timeout(self):
+        post = self.create_post()
+        with mock.patch.object(
+                stampede, 'acquire', return_value=False) as acquire:
+            get_thumbnail(post.image, GEOMETRY, **OPTIONS)
+        self.assertEqual(acquire.call_args[0][1], 600)
+
+
+@override_settings(POST_THUMBNAIL_WORKERS=1)
+class ThumbnailPoolTests(SimpleTestCase):
+    """Настоящий пул: процессы запускаются через spawn и django.setup."""
+
+    def setUp(self):
+        self.addCleanup(thumbnails.shutdown)
+        # Без увеличения: в этом окружении Pillow может не знать ANTIALIAS.
+        self.job = (
+            'cache/pool.gif', SMALL_GIF, '2x1',
+            thumbnails.AsyncThumbnailBackend().thumbnail_options(
+                None, {'upscale': False}),
+        )
+
+    def test_render_in_spawned_process(self):
+        content, size, source_size = thumbnails.pool().submit(
+            thumbnails.render, *self.job).result(timeout=60)
+        self.assertTrue(content)
+        self.assertEqual(tuple(size), (2, 1))
+        self.assertEqual(tuple(source_size), (2, 1))
+
+    def test_broken_pool_is_replaced(self):
+        broken = thumbnails.pool()
+        with self.assertRaises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result(timeout=60)
+        source = mock.Mock(**{'read.return_value': SMALL_GIF})
+        thumbnail = mock.Mock()
+        thumbnail.name = self.job[0]
+        self.addCleanup(stampede.release, thumbnail.name)
+        with mock.patch.object(thumbnails, 'save'), self.assertLogs(
+                'posts.thumbnails', 'WARNING'):
+            future = thumbnails.schedule(source, thumbnail, *self.job[2:])
+        self.assertEqual(tuple(future.result(timeout=60)[1]), (2, 1))
+        self.assertIsNot(thumbnails.pool(), broken)
+
+    def test_broken_pool_releases_lease(self):
+        broken = thumbnails.pool()
+        future = broken.submit(os._exit, 1)
+        with self.assertRaises(BrokenProcessPool):
+            future.result(timeout=60)
+        self.assertTrue(stampede.acquire('cache/lost.gif'))
+        thumbnail = mock.Mock()
+        thumbnail.name = 'cache/lost.gif'
+        with self.assertLogs('posts.thumbnails', 'WARNING'):
+            thumbnails.save(None, thumbnail, (), future, executor=broken)
+        self.assertTrue(stampede.acquire('cache/lost.gif'))
+        stampede.release('cache/lost.gif')
+        self.assertIsNot(thumbnails.pool(), broken)
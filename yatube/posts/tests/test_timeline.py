@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [new_post, self.old_post])
+
+    def test_unfollow_prunes_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    def test_timeline_is_capped(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timeline, 'TIMELINE_MAX_ENTRIES', 2):
+            posts = [
+                Post.objects.create(author=self.author, text=f'Пост {i}')
+                for i in range(3)
+            ]
+        self.assertEqual(
+            [entry.post for entry in self.reader.timeline.all()],
+            posts[:0:-1],
+        )
+
+    def test_fan_out_trims_all_followers_in_one_query(self):
+        for number in range(5):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'reader{number}'),
+                author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        with mock.patch.object(timeline, 'TIMELINE_MAX_ENTRIES', 1):
+            # Подписчики, вставка и удаление — при любом числе читателей.
+            with self.assertNumQueries(3):
+                timeline.fan_out(post)
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('post', flat=True)),
+            [post.pk] * 5)
+
+    def test_rebuild_command(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timeline', stdout=mock.MagicMock())
+        self.assertEqual(
+            list(self.reader.timeline.values_list('post', flat=True)),
+            [self.old_post.pk],
+        )
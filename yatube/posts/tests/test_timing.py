@@ -0,0 +1,74 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import timing
+from ..models import Post
+
+User = get_user_model()
+
+
+def parse(header):
+    metrics = {}
+    for part in header.split(', '):
+        name, *params = part.split(';')
+        metrics[name] = dict(param.split('=') for param in params)
+    return metrics
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_header_splits_request_time(self):
+        response = self.client.get(reverse('posts:index'))
+        metrics = parse(response['Server-Timing'])
+        self.assertEqual(
+            set(metrics), {'db', 'tpl', 'cache', 'view', 'total'})
+        self.assertGreater(int(metrics['db']['desc'].strip('"')), 0)
+        self.assertIn('desc', metrics['tpl'])
+        self.assertIn('desc', metrics['cache'])
+        parts = sum(float(metrics[kind]['dur'])
+                    for kind in ('db', 'tpl', 'cache', 'view'))
+        self.assertAlmostEqual(
+            parts, float(metrics['total']['dur']), delta=0.05)
+
+    def test_cached_page_has_fresh_header(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'))
+        metrics = parse(response['Server-Timing'])
+        self.assertNotIn('tpl', {
+            kind for kind, params in metrics.items() if 'desc' in params})
+
+    def test_log_line(self):
+        with self.assertLogs('posts.timing', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        record = logs.records[0]
+        self.assertRegex(
+            record.getMessage(),
+            re.compile(r'^method=GET path=/ status=200 db=[\d.]+ '))
+        self.assertEqual(record.server_timing['status'], 200)
+
+    def test_nested_time_is_exclusive(self):
+        timer = timing.RequestTimer()
+        timer.enter('tpl')
+        timer.enter('db')
+        timer.exit()
+        timer.enter('tpl')
+        timer.exit()
+        timer.exit()
+        timer.stop()
+        self.assertEqual(timer.counts, {'tpl': 1, 'db': 1})
+        metrics = timer.metrics()
+        self.assertAlmostEqual(
+            metrics['db'] + metrics['tpl'] + metrics['view'],
+            metrics['total'])
@@ -16,7 +16,7 @@ User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_THUMBNAIL_WORKERS=0)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -106,7 +106,8 @@ class PostPagesTests(TestCase):
     def test_index_cache(self):
         cache.clear()
         response_1 = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.all().delete()
+        # update() не шлёт сигналов, версия ленты остаётся прежней.
+        Post.objects.all().update(text='Изменённый текст')
         response_2 = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(response_1.content, response_2.content)
         cache.delete('index_page')
@@ -114,6 +115,30 @@ class PostPagesTests(TestCase):
         response_3 = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(response_1.content, response_3.content)
 
+    def test_index_cache_is_page_aware(self):
+        cache.clear()
+        for i in range(10):
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+        response_1 = self.guest_client.get(reverse('posts:index'))
+        response_2 = self.guest_client.get(
+            reverse('posts:index'), {'page': 2})
+        self.assertContains(response_1, 'Пост 9')
+        self.assertNotContains(response_2, 'Пост 9')
+        self.assertContains(response_2, self.post.text)
+
+    def test_new_post_invalidates_feed_cache(self):
+        cache.clear()
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}))
+        Post.objects.create(
+            author=self.user, text='Свежий пост', group=self.group)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}))
+        self.assertContains(response, 'Свежий пост')
+
     def test_new_post_for_following(self):
         Follow.objects.create(
             user=self.user,
@@ -0,0 +1,92 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import versions
+from ..models import Comment, Follow, Post
+from ..writequeue import WriteQueue, write_queue
+
+User = get_user_model()
+
+
+@override_settings(WRITE_QUEUE=True, WRITE_QUEUE_BATCH_MS=50)
+class WriteQueueTests(TransactionTestCase):
+    """Писатель работает в своём потоке, поэтому данные коммитятся."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.queue = WriteQueue()
+        write_queue.batches = 0
+        self.addCleanup(self.queue.stop)
+        self.addCleanup(write_queue.stop)
+
+    def comment(self, text):
+        return Comment.objects.create(
+            post=self.post, author=self.user, text=text)
+
+    def test_concurrent_writes_share_batches(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(
+                self.queue.submit(self.comment, f'Ответ {i}')))
+            for i in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 10)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertLess(self.queue.batches, 10)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 10)
+
+    def test_versions_are_bumped_after_commit(self):
+        scope = f'post:{self.post.pk}'
+
+        def write():
+            self.comment('Ответ')
+            # Версия, под которой другой запрос закэшировал бы ещё
+            # не закоммиченное состояние.
+            return versions.get_version(scope)
+
+        during = self.queue.submit(write)
+        self.assertNotEqual(versions.get_version(scope), during)
+
+    def test_failed_write_does_not_break_batch(self):
+        def duplicate():
+            Post.objects.create(author=self.user, text='Пост')
+
+        errors = []
+
+        def run_duplicate():
+            try:
+                self.queue.submit(duplicate)
+            except IntegrityError as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=run_duplicate)
+        thread.start()
+        self.queue.submit(self.comment, 'Ответ')
+        thread.join()
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(Comment.objects.filter(text='Ответ').exists())
+
+    def test_views_write_through_queue(self):
+        reader = User.objects.create_user(username='reader')
+        client = Client()
+        client.force_login(reader)
+        client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Из очереди'},
+        )
+        client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'}))
+        self.assertTrue(Comment.objects.filter(text='Из очереди').exists())
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=self.user).exists())
+        self.assertEqual(write_queue.batches, 2)
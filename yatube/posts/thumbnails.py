@@ -0,0 +1,265 @@
+import functools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import quote
+
+import django
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import DummyImageFile, ImageFile
+
+from . import stampede, versions
+
+logger = logging.getLogger('posts.thumbnails')
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}">'
+    '<rect width="100%" height="100%" fill="#e9ecef"/></svg>'
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def placeholders_rendered():
+    """Сколько заглушек создано в текущем потоке."""
+    return getattr(_local, 'placeholders', 0)
+
+
+class Placeholder(DummyImageFile):
+    """Серый прямоугольник размера миниатюры, пока она не готова."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _local.placeholders = placeholders_rendered() + 1
+
+    @property
+    def url(self):
+        return 'data:image/svg+xml,' + quote(
+            PLACEHOLDER_SVG.format(self.x, self.y))
+
+
+class _Content:
+    def __init__(self, content):
+        self.content = content
+
+    def read(self):
+        return self.content
+
+
+class _Capture:
+    """Принимает результат ThumbnailBackend._create_thumbnail в процессе
+    пула: файл сохраняет уже основной процесс."""
+
+    content = size = None
+
+    def __init__(self, name):
+        self.name = name
+
+    def write(self, content):
+        self.content = content
+
+    def set_size(self, size):
+        self.size = size
+
+
+def render(name, content, geometry_string, options):
+    """Миниатюра из байтов оригинала: (байты, размер, размер оригинала).
+
+    Выполняется в процессе пула и не трогает ни базу, ни хранилище.
+    """
+    source_image = default.engine.get_image(_Content(content))
+    try:
+        options = {
+            **options, 'image_info': default.engine.get_image_info(
+                source_image),
+        }
+        thumbnail = _Capture(name)
+        ThumbnailBackend()._create_thumbnail(
+            source_image, geometry_string, options, thumbnail)
+        return (thumbnail.content, thumbnail.size,
+                default.engine.get_image_size(source_image))
+    finally:
+        default.engine.cleanup(source_image)
+
+
+def pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'POST_THUMBNAIL_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _pool
+
+
+def _discard(executor):
+    """Убирает сломанный пул: следующий pool() создаст новый."""
+    global _pool
+    with _pool_lock:
+        if _pool is executor:
+            _pool = None
+    executor.shutdown(wait=False)
+
+
+def _submit(*job):
+    """Ставит render в пул; возвращает пул и future."""
+    executor = pool()
+    try:
+        return executor, executor.submit(render, *job)
+    except BrokenProcessPool:
+        # Процесс пула умер (например, его убил OOM killer), и пул
+        # больше не принимает задач.
+        logger.warning('Thumbnail pool is broken, starting a new one')
+        _discard(executor)
+        executor = pool()
+        return executor, executor.submit(render, *job)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        executor, _pool = _pool, None
+    if executor is not None:
+        executor.shutdown()
+
+
+def save(source, thumbnail, scopes, future, executor=None):
+    """Сохраняет готовую миниатюру и сбрасывает страницы с заглушкой.
+
+    После ошибки блокировка остаётся до истечения: следующая попытка —
+    не раньше чем через POST_THUMBNAIL_LEASE_TIMEOUT секунд. Если же
+    сломался пул executor, он заменяется новым, а блокировка снимается
+    сразу.
+    """
+    try:
+        content, size, source_size = future.result()
+        thumbnail.write(content)
+        thumbnail.set_size(size)
+        source.set_size(source_size)
+        default.kvstore.get_or_set(source)
+        default.kvstore.set(thumbnail, source)
+    except BrokenProcessPool:
+        logger.warning('Thumbnail %s lost with a broken pool', thumbnail.name)
+        if executor is not None:
+            _discard(executor)
+        stampede.release(thumbnail.name)
+        return
+    except Exception:
+        logger.exception('Thumbnail %s failed', thumbnail.name)
+        return
+    stampede.release(thumbnail.name)
+    versions.bump(*scopes)
+
+
+def schedule(source, thumbnail, geometry_string, options, scopes=()):
+    """Ставит миниатюру в пул, если её ещё никто не делает.
+
+    При POST_THUMBNAIL_WORKERS = 0 миниатюра делается сразу. Блокировка
+    живёт POST_THUMBNAIL_LEASE_TIMEOUT секунд: задача может подолгу
+    ждать в очереди пула.
+    """
+    if not stampede.acquire(thumbnail.name, getattr(
+            settings, 'POST_THUMBNAIL_LEASE_TIMEOUT', 300)):
+        return None
+    try:
+        job = (thumbnail.name, source.read(), geometry_string, options)
+        executor = None
+        if getattr(settings, 'POST_THUMBNAIL_WORKERS', 2):
+            executor, future = _submit(*job)
+        else:
+            future = Future()
+            try:
+                future.set_result(render(*job))
+            except Exception as error:
+                future.set_exception(error)
+    except Exception:
+        stampede.release(thumbnail.name)
+        raise
+    future.add_done_callback(functools.partial(
+        save, source, thumbnail, scopes, executor=executor))
+    return future
+
+
+def post_scopes(post):
+    """Области версий страниц, где видна миниатюра поста."""
+    if post is None or not post.pk:
+        return ()
+    scopes = [f'post:{post.pk}', f'author:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
+
+
+class AsyncThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который не делает миниатюры в запросе.
+
+    Готовая миниатюра берётся из хранилища ключей sorl как обычно.
+    Недостающая ставится в пул процессов (см. schedule), а тег
+    {% thumbnail %} пока получает заглушку того же размера. Когда
+    миниатюра готова, поднимаются версии поста, автора и группы, и
+    закэшированные страницы с заглушкой пересчитываются.
+    """
+
+    def thumbnail_options(self, source, options):
+        """Параметры с умолчаниями — так же, как в get_thumbnail sorl."""
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        full_options = self.thumbnail_options(source, options)
+        thumbnail = ImageFile(
+            self._get_thumbnail_filename(
+                source, geometry_string, full_options),
+            default.storage,
+        )
+        cached = default.kvstore.get(thumbnail)
+        if cached:
+            return cached
+        if thumbnail.exists():
+            # Файл уже есть, нет только записи в хранилище ключей.
+            return super().get_thumbnail(file_, geometry_string, **options)
+        future = schedule(
+            source, thumbnail, geometry_string, full_options,
+            post_scopes(getattr(file_, 'instance', None)))
+        if future is not None and future.done():
+            return default.kvstore.get(thumbnail) or Placeholder(
+                geometry_string)
+        return Placeholder(geometry_string)
+
+
+def pregenerate(post):
+    """Ставит в очередь все размеры из POST_THUMBNAILS для поста.
+
+    Пост уже сохранён, поэтому ошибка только пишется в лог: миниатюру
+    поставит в очередь первый показ страницы.
+    """
+    if not post.image:
+        return
+    for geometry_string, options in getattr(settings, 'POST_THUMBNAILS', ()):
+        try:
+            default.backend.get_thumbnail(
+                post.image, geometry_string, **options)
+        except Exception:
+            logger.exception(
+                'Thumbnail %s for post %s was not queued',
+                geometry_string, post.pk)
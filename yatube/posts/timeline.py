@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import QuerySet
+
+from .models import Follow, Post, PostQuerySet, TimelineEntry
+from .paginator import KeysetPaginator
+
+TIMELINE_MAX_ENTRIES = getattr(settings, 'TIMELINE_MAX_ENTRIES', 1000)
+
+
+def _entry(user_id, post):
+    return TimelineEntry(
+        user_id=user_id,
+        post=post,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+TRIM_SQL = (
+    'DELETE FROM {table} WHERE id IN ('
+    'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+    'PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+    ') AS position FROM {table} WHERE user_id IN ({users})'
+    ') WHERE position > %s)'
+)
+
+
+def trim(user_ids):
+    """Оставляет в ленте каждого пользователя не больше лимита записей.
+
+    user_ids — список или запрос .values('user_id'); лишние записи всех
+    лент удаляются одним запросом с оконной функцией.
+    """
+    if isinstance(user_ids, QuerySet):
+        users, params = user_ids.query.sql_with_params()
+    else:
+        params = list(user_ids)
+        if not params:
+            return
+        users = ', '.join(['%s'] * len(params))
+    connection = connections[router.db_for_write(TimelineEntry)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            TRIM_SQL.format(
+                table=connection.ops.quote_name(
+                    TimelineEntry._meta.db_table),
+                users=users,
+            ),
+            [*params, TIMELINE_MAX_ENTRIES],
+        )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    TimelineEntry.objects.bulk_create(
+        (_entry(user_id, post) for user_id in follower_ids),
+        ignore_conflicts=True,
+    )
+    trim(Follow.objects.filter(
+        author_id=post.author_id).values('user_id'))
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту свежие посты автора после подписки."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).only('pk', 'author_id', 'pub_date')[:TIMELINE_MAX_ENTRIES]
+    TimelineEntry.objects.bulk_create(
+        (_entry(user_id, post) for post in posts),
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    TimelineEntry.objects.all().delete()
+    for user_id, author_id in Follow.objects.values_list('user_id',
+                                                         'author_id'):
+        backfill(user_id, author_id)
+
+
+class TimelinePaginator(KeysetPaginator):
+    """Лента подписок: диапазон по индексу (user, pub_date, post)."""
+
+    key_fields = ('pub_date', 'post_id')
+
+    def get_items(self, rows):
+        return [row.post for row in rows]
+
+
+def timeline_for(user):
+    return TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    ).only('pub_date', 'post_id', *(
+        f'post__{field}' for field in PostQuerySet.FEED_FIELDS))
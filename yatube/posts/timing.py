@@ -0,0 +1,179 @@
+import functools
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.base import Template
+
+CACHE_METHODS = (
+    'get', 'set', 'add', 'delete', 'get_many', 'set_many', 'delete_many',
+    'incr', 'decr', 'touch', 'has_key',
+)
+
+# Префиксы ключей, по которым считаются попадания в кэш.
+CACHE_NAMESPACES = (
+    ('template.cache.', 'fragment'),
+    (getattr(settings, 'THUMBNAIL_KEY_PREFIX', 'sorl-thumbnail'),
+     'thumbnail'),
+    ('page_cache:', 'page'),
+)
+
+_local = threading.local()
+_installed = False
+
+
+class RequestTimer:
+    """Время запроса по видам работы: db, tpl, cache и остальное (view).
+
+    Время считается без вложенности: запрос к базе во время рендеринга
+    шаблона вычитается из tpl, поэтому части в сумме не больше total.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.lookups = defaultdict(int)
+        self.stack = []
+
+    def enter(self, kind):
+        now = time.perf_counter()
+        if self.stack:
+            outer_kind, resumed = self.stack[-1]
+            self.durations[outer_kind] += now - resumed
+        if not self.stack or outer_kind != kind:
+            self.counts[kind] += 1
+        self.stack.append([kind, now])
+
+    def exit(self):
+        now = time.perf_counter()
+        kind, resumed = self.stack.pop()
+        self.durations[kind] += now - resumed
+        if self.stack:
+            self.stack[-1][1] = now
+
+    def lookup(self, key, hit):
+        """Учитывает чтение из кэша, если ключ из известного пространства."""
+        for prefix, namespace in CACHE_NAMESPACES:
+            if str(key).startswith(prefix):
+                self.lookups[namespace, 'hit' if hit else 'miss'] += 1
+                return
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def metrics(self):
+        """Миллисекунды по видам работы, view — остаток до total."""
+        total = ((self.finished or time.perf_counter()) - self.started) * 1000
+        metrics = {kind: self.durations[kind] * 1000
+                   for kind in ('db', 'tpl', 'cache')}
+        metrics['view'] = max(total - sum(metrics.values()), 0.0)
+        metrics['total'] = total
+        return metrics
+
+    def header(self):
+        parts = []
+        for kind, duration in self.metrics().items():
+            part = f'{kind};dur={duration:.2f}'
+            if self.counts.get(kind):
+                part += f';desc="{self.counts[kind]}"'
+            parts.append(part)
+        return ', '.join(parts)
+
+
+def current():
+    return getattr(_local, 'timer', None)
+
+
+def start():
+    _local.timer = RequestTimer()
+    return _local.timer
+
+
+def stop():
+    timer = _local.__dict__.pop('timer', None)
+    if timer is not None:
+        timer.stop()
+    return timer
+
+
+def lookup(key, hit):
+    """Учитывает чтение из кэша, которое обёртка get не видит."""
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.lookup(key, hit)
+
+
+def timed(kind, func):
+    """Оборачивает func так, чтобы её время шло в счёт kind."""
+    if getattr(func, 'timed_kind', None):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timer = getattr(_local, 'timer', None)
+        if timer is None:
+            return func(*args, **kwargs)
+        timer.enter(kind)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timer.exit()
+    wrapper.timed_kind = kind
+    return wrapper
+
+
+def timed_get(func):
+    """Как timed('cache', ...), но ещё учитывает попадания и промахи."""
+    if getattr(func, 'timed_kind', None):
+        return func
+    timed_func = timed('cache', func)
+
+    @functools.wraps(func)
+    def get(self, key, default=None, *args, **kwargs):
+        timer = getattr(_local, 'timer', None)
+        # Чтение из нижнего уровня двухуровневого кэша — тот же поиск.
+        nested = timer is not None and any(
+            kind == 'cache' for kind, _ in timer.stack)
+        value = timed_func(self, key, default, *args, **kwargs)
+        if timer is not None and not nested:
+            timer.lookup(key, value is not None and value is not default)
+        return value
+    get.timed_kind = 'cache'
+    return get
+
+
+def db_wrapper(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper."""
+    timer = getattr(_local, 'timer', None)
+    if timer is None:
+        return execute(sql, params, many, context)
+    timer.enter('db')
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.exit()
+
+
+def instrument():
+    """Один раз подменяет рендеринг шаблонов и методы бэкендов кэша.
+
+    Вне запроса с таймером обёртки сразу вызывают исходный метод.
+    """
+    global _installed
+    if _installed:
+        return
+    Template.render = timed('tpl', Template.render)
+    for backend in {type(caches[alias]) for alias in settings.CACHES}:
+        for name in CACHE_METHODS:
+            method = getattr(backend, name, None)
+            if method is None:
+                continue
+            if name == 'get':
+                setattr(backend, name, timed_get(method))
+            else:
+                setattr(backend, name, timed('cache', method))
+    _installed = True
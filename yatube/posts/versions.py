@@ -0,0 +1,60 @@
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+FEED_CACHE_TIMEOUT = getattr(settings, 'FEED_CACHE_TIMEOUT', 60 * 60 * 24)
+VERSION_KEY = 'feed_version:{}'
+
+
+def _initial():
+    # Версия из часов, а не 1: если ключ вытеснен из кэша, новая версия
+    # не совпадёт ни с одной из тех, под которыми лежат старые фрагменты.
+    return int(time.time() * 1000)
+
+
+def get_versions(*scopes):
+    """Версии областей по отдельности, в том же порядке."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: _initial() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [str(versions[key]) for key in keys]
+
+
+def get_version(*scopes):
+    """Общая версия набора областей, например ('posts', 'author:1')."""
+    return '.'.join(get_versions(*scopes))
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial(), None)
+
+
+def index_version():
+    return get_version('posts')
+
+
+def group_version(group):
+    return get_version(f'group:{group.pk}')
+
+
+def bump_on_commit(*scopes):
+    """bump сейчас и ещё раз после коммита текущей транзакции.
+
+    Между первым bump и коммитом другой запрос может прочитать старые
+    данные и закэшировать их уже под новой версией — второй bump
+    делает такую запись устаревшей. Вне транзакции bump один.
+    """
+    bump(*scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(bump, *scopes))
@@ -1,54 +1,78 @@
+import hmac
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect, render
 
+from . import conditional, metrics, thumbnails, writequeue
+from .counters import counters_for
+from .feeds import follow_feed
 from .forms import CommentForm, PostForm
+from .middleware import author_tags, page_tags, tag_page
 from .models import Follow, Group, Post, User
+from .objectcache import get_object_or_404
+from .paginator import paginate
+from .versions import FEED_CACHE_TIMEOUT, group_version, index_version
 
 
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Теги и версия ленты — до чтения постов, см. tag_page.
+    tag_page(request, 'posts')
+    feed_version = index_version()
+    post_list = Post.objects.for_feed()
+    page_obj = paginate(request, post_list)
     context = {
         'title': 'Последние обновления на сайте',
         'page_obj': page_obj,
+        'feed_version': feed_version,
+        'feed_tags': partial(author_tags, page_obj),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@conditional.condition(etag_func=conditional.group_etag,
+                       last_modified_func=conditional.group_last_modified)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    tag_page(request, f'group:{group.pk}')
+    feed_version = group_version(group)
+    posts = group.posts.for_feed()
     group_list_title = f'Записи сообщества {group.title}'
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts)
     context = {
         'group': group,
         'title': group_list_title,
         'page_obj': page_obj,
+        'feed_version': feed_version,
+        'feed_tags': partial(author_tags, page_obj),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@conditional.condition(etag_func=conditional.profile_etag,
+                       last_modified_func=conditional.profile_last_modified)
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    post_count = post_list.count()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username)
+    tag_page(request, f'author:{author.pk}')
+    post_list = author.posts.for_feed()
+    counters = counters_for(author)
+    page_obj = paginate(request, post_list)
+    tag_page(request, *page_tags(page_obj))
     following = (
         request.user.is_authenticated and author.following.all().filter(
             user=request.user).exists()
     )
     context = {
-        'post_count': post_count,
+        'post_count': counters.posts_count,
+        'counters': counters,
         'page_obj': page_obj,
         'author': author,
         'following': following,
@@ -56,13 +80,17 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@conditional.condition(etag_func=conditional.post_etag,
+                       last_modified_func=conditional.post_last_modified)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    author = post.author
-    post_count = author.posts.all().count()
+    tag_page(request, f'post:{post_id}')
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'), pk=post_id)
+    post_count = counters_for(post.author).posts_count
     comment_form = CommentForm()
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
+    tag_page(request, *page_tags([post]), *author_tags(comments))
     context = {
         'post': post,
         'post_count': post_count,
@@ -82,7 +110,8 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        writequeue.submit(post.save)
+        thumbnails.pregenerate(post)
         return redirect('posts:profile', request.user)
     return render(request, template, {'form': form})
 
@@ -99,7 +128,8 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        writequeue.submit(form.save)
+        thumbnails.pregenerate(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -117,16 +147,13 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        writequeue.submit(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = follow_feed(request)
     context = {
         'page_obj': page_obj,
     }
@@ -138,7 +165,8 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
     if user != author:
-        Follow.objects.get_or_create(user=user, author=author)
+        writequeue.submit(
+            Follow.objects.get_or_create, user=user, author=author)
     return redirect('posts:profile', author)
 
 
@@ -146,5 +174,24 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     follow = Follow.objects.filter(user=request.user, author=author)
-    follow.delete()
+    writequeue.submit(follow.delete)
     return redirect('posts:follow_index')
+
+
+def metrics_export(request):
+    """Метрики всех процессов в формате Prometheus.
+
+    Доступны сотрудникам сайта и по токену METRICS_TOKEN. Адрес клиента
+    не проверяется: за обратным прокси на той же машине любой запрос
+    приходит с 127.0.0.1.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    authorized = token and hmac.compare_digest(
+        authorization.encode(), f'Bearer {token}'.encode())
+    if not authorized and not request.user.is_staff:
+        raise Http404
+    return HttpResponse(
+        metrics.render(metrics.snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,122 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import routers
+
+_STOP = object()
+
+
+class WriteQueue:
+    """Единственный поток-писатель для SQLite.
+
+    Операции из разных запросов копятся WRITE_QUEUE_BATCH_MS миллисекунд
+    (не больше WRITE_QUEUE_BATCH_SIZE штук) и выполняются одной
+    транзакцией, каждая в своей точке сохранения: ошибка одной операции
+    не откатывает остальные. Запрос ждёт, пока пачка закоммитится, и
+    получает свой результат или исключение. Версии и кэш сигналы
+    сбрасывают ещё раз после коммита пачки (transaction.on_commit).
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.batches = 0
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='write-queue', daemon=True)
+                self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None and thread.is_alive():
+            self.queue.put(_STOP)
+            thread.join()
+
+    def submit(self, func, *args, **kwargs):
+        """Выполняет func в потоке-писателе и возвращает её результат.
+
+        Внутри открытой транзакции и в самом потоке-писателе func
+        вызывается сразу, чтобы не выпасть из текущей транзакции.
+        """
+        if (threading.current_thread() is self.thread
+                or connections[self.using].in_atomic_block):
+            return func(*args, **kwargs)
+        future = Future()
+        self.start()
+        self.queue.put((func, args, kwargs, future))
+        return future.result(
+            timeout=getattr(settings, 'WRITE_QUEUE_TIMEOUT', 30))
+
+    def next_batch(self):
+        batch = [self.queue.get()]
+        size = getattr(settings, 'WRITE_QUEUE_BATCH_SIZE', 100)
+        deadline = time.monotonic() + getattr(
+            settings, 'WRITE_QUEUE_BATCH_MS', 2) / 1000
+        while batch[-1] is not _STOP and len(batch) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def execute(self, batch):
+        outcomes = []
+        try:
+            with transaction.atomic(using=self.using):
+                for func, args, kwargs, future in batch:
+                    try:
+                        with transaction.atomic(using=self.using):
+                            outcomes.append(
+                                (future, func(*args, **kwargs), None))
+                    except Exception as error:
+                        outcomes.append((future, None, error))
+        except Exception as error:
+            outcomes = [(item[-1], None, error) for item in batch]
+        self.batches += 1
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def run(self):
+        connection = connections[self.using]
+        try:
+            while True:
+                batch = self.next_batch()
+                stop = batch[-1] is _STOP
+                if stop:
+                    batch.pop()
+                if batch:
+                    self.execute(batch)
+                connection.close_if_unusable_or_obsolete()
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+
+write_queue = WriteQueue()
+
+
+def submit(func, *args, **kwargs):
+    """Запись из представления: через очередь, если WRITE_QUEUE включён."""
+    if not getattr(settings, 'WRITE_QUEUE', False):
+        return func(*args, **kwargs)
+    # Роутер в потоке-писателе не видит запрос — закрепляем его здесь.
+    routers.note_write()
+    return write_queue.submit(func, *args, **kwargs)
@@ -10,11 +10,27 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Служебные файлы: общий кэш, метрики, профили, журнал медленных
+# запросов. Тесты (manage.py test и pytest) получают свой каталог на
+# каждый запуск и не трогают файлы работающего сайта; процессы пула
+# миниатюр берут каталог запуска из окружения.
+VAR_DIR = os.path.join(BASE_DIR, 'var')
+if sys.argv[1:2] == ['test'] or 'pytest' in sys.modules:
+    VAR_DIR = os.environ.get('YATUBE_TEST_VAR_DIR')
+    if VAR_DIR is None:
+        VAR_DIR = tempfile.mkdtemp(prefix='yatube-test-')
+        os.environ['YATUBE_TEST_VAR_DIR'] = VAR_DIR
+        atexit.register(shutil.rmtree, VAR_DIR, True)
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -47,10 +63,12 @@ INSTALLED_APPS = [
     'about.apps.AboutConfig',
     'sorl.thumbnail',
     'django.contrib.staticfiles',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'posts.middleware.ServerTimingMiddleware',
+    'posts.middleware.SlowRequestProfilerMiddleware',
+    'posts.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,9 +76,18 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'posts.middleware.AnonymousPageCacheMiddleware',
 ]
 
+# debug_toolbar нужен только при разработке; в бою время запросов
+# показывает posts.middleware.ServerTimingMiddleware.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('posts.middleware.AnonymousPageCacheMiddleware'),
+        'debug_toolbar.middleware.DebugToolbarMiddleware',
+    )
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -87,13 +114,22 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# WAL, прагмы и BEGIN IMMEDIATE — см. core/backends/sqlite3/base.py.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Реплики только для чтения, например
+# 'replica': {'ENGINE': 'core.backends.sqlite3', 'NAME': 'replica.sqlite3'}
+# в DATABASES и 'replica' здесь; синхронизирует команда sync_replicas.
+REPLICA_DATABASES = []
+
+DATABASE_ROUTERS = ['posts.routers.PrimaryReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -148,12 +184,60 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# default — двухуровневый кэш: LRU в памяти процесса поверх общего для
+# всех процессов кэша в SQLite. Счётчики версий, статистика, блокировки
+# пересчёта и списки свежих постов авторов (их не проверяет версия)
+# читаются только из общего кэша, поэтому сброс виден всем процессам
+# сразу.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.backends.cache.TwoTierCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            'SHARED_KEY_PREFIXES': [
+                'feed_version:', 'page_cache_stats:', 'stampede_lease:',
+                'author_recent_posts:',
+            ],
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.backends.cache.SQLiteCache',
+        'LOCATION': os.path.join(VAR_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
 }
 
+# Миниатюры sorl-thumbnail не делаются в запросе: пока миниатюры нет,
+# тег {% thumbnail %} отдаёт заглушку, а сама она готовится в пуле из
+# POST_THUMBNAIL_WORKERS процессов (0 — прямо в запросе). Размеры из
+# POST_THUMBNAILS ставятся в очередь сразу при создании и правке поста.
+# Пока миниатюра в очереди, второй раз её не ставят — но не дольше
+# POST_THUMBNAIL_LEASE_TIMEOUT секунд.
+THUMBNAIL_BACKEND = 'posts.thumbnails.AsyncThumbnailBackend'
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+POST_THUMBNAIL_WORKERS = 2
+POST_THUMBNAIL_LEASE_TIMEOUT = 300
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Токен для /metrics/: сборщик метрик передаёт его в заголовке
+# "Authorization: Bearer <токен>". Без токена метрики видят только
+# сотрудники сайта.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN')
+
+# Движок ленты подписок: 'timeline' (таблица лент), 'merge' (слияние
+# закэшированных списков постов авторов) или 'join' (запрос с JOIN).
+FOLLOW_FEED_ENGINE = 'timeline'
+
+# Записи из представлений через один поток-писатель, который собирает их
+# в общие транзакции (posts/writequeue.py). Имеет смысл для SQLite под
+# многопоточным WSGI-сервером.
+WRITE_QUEUE = False
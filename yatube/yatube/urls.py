@@ -28,6 +28,7 @@ urlpatterns = [
     path('auth', include('django.contrib.auth.urls')),
     path('auth/', include('users.urls', namespace='users')),
     path('about/', include('about.urls', namespace='about')),
+    path('metrics/', views.metrics_export, name='metrics'),
 ]
 
 handler404 = 'core.views.page_not_found'